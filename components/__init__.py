@@ -17,6 +17,18 @@ from .layout import (
     empty_state
 )
 from .auth import show_login_form, logout
+from .assets import load_asset, asset_stats
+from .profiler import start_page_profile, profiler_panel, profile_records
+from .data import (
+    load_dashboard_stats,
+    load_recent_ncrs,
+    load_ncr_page,
+    load_all_tags,
+    load_tag_suggestions,
+    load_rollups,
+    clear_data_cache,
+    page_loads
+)
 
 __all__ = [
     'inject_theme_css',
@@ -34,5 +46,18 @@ __all__ = [
     'section_divider',
     'empty_state',
     'show_login_form',
-    'logout'
+    'logout',
+    'load_asset',
+    'asset_stats',
+    'start_page_profile',
+    'profiler_panel',
+    'profile_records',
+    'load_dashboard_stats',
+    'load_recent_ncrs',
+    'load_ncr_page',
+    'load_all_tags',
+    'load_tag_suggestions',
+    'load_rollups',
+    'clear_data_cache',
+    'page_loads'
 ]
@@ -0,0 +1,176 @@
+"""
+Asset Pipeline for NCTracker
+Loads, minifies and fingerprints files from assets/ once per process and
+serves them from memory
+"""
+
+import base64
+import hashlib
+import io
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+ASSET_DIR = Path(__file__).parent.parent / "assets"
+# Re-stat files on every load so edits show up without a restart; set to 0 in
+# production to skip the stat call
+ASSET_RELOAD = os.environ.get("NCTRACKER_ASSET_RELOAD", "1") != "0"
+IMAGE_QUALITY = int(os.environ.get("NCTRACKER_ASSET_IMAGE_QUALITY", "80"))
+
+MIME_TYPES = {
+    '.css': 'text/css',
+    '.js': 'text/javascript',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp',
+}
+_CSS_TOKEN = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r' ?([{};,>]) ?')
+
+
+class Asset(NamedTuple):
+    """A processed asset as served to the browser"""
+    name: str
+    mime: str
+    data: bytes
+    fingerprint: str
+    mtime: int
+    source_size: int
+
+    @property
+    def text(self) -> str:
+        return self.data.decode('utf-8')
+
+    @property
+    def data_uri(self) -> str:
+        return _data_uri(self)
+
+
+_assets: Dict[str, Asset] = {}
+_data_uris: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _squeeze_css(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = _CSS_PUNCTUATION.sub(r'\1', text)
+    return text.replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and redundant whitespace, leaving string literals intact"""
+    parts = []
+    buffer = ''
+    position = 0
+    for match in _CSS_TOKEN.finditer(css):
+        buffer += css[position:match.start()]
+        position = match.end()
+        if match.group(1) is None:
+            buffer += ' '
+            continue
+        parts.append(_squeeze_css(buffer))
+        parts.append(match.group(1))
+        buffer = ''
+    parts.append(_squeeze_css(buffer + css[position:]))
+    return ''.join(parts).strip()
+
+
+def minify_js(js: str) -> str:
+    """Strip indentation, blank lines and whole-line // comments"""
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def optimize_image(data: bytes, mime: str) -> tuple:
+    """
+    Re-encode a raster image as WebP when Pillow is available and the result
+    is smaller, returning ``(data, mime)``
+    """
+    try:
+        from PIL import Image
+    except ImportError:  # pragma: no cover - Pillow ships with Streamlit
+        return data, mime
+    output = io.BytesIO()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.save(output, 'WEBP', quality=IMAGE_QUALITY, method=6)
+    except (OSError, ValueError):
+        return data, mime
+    if output.tell() >= len(data):
+        return data, mime
+    return output.getvalue(), 'image/webp'
+
+
+def _build(name: str, path: Path, mtime: int) -> Asset:
+    raw = path.read_bytes()
+    mime = MIME_TYPES.get(path.suffix.lower(), 'application/octet-stream')
+    if mime == 'text/css':
+        data = minify_css(raw.decode('utf-8')).encode('utf-8')
+    elif mime == 'text/javascript':
+        data = minify_js(raw.decode('utf-8')).encode('utf-8')
+    elif mime.startswith('image/') and mime != 'image/webp':
+        data, mime = optimize_image(raw, mime)
+    else:
+        data = raw
+    fingerprint = hashlib.sha256(data).hexdigest()[:12]
+    return Asset(name, mime, data, fingerprint, mtime, len(raw))
+
+
+def load_asset(name: str) -> Optional[Asset]:
+    """
+    Return the processed asset ``assets/<name>``, or None if it does not
+    exist. Results are kept in memory and rebuilt when the file's mtime
+    changes (unless ASSET_RELOAD is off).
+    """
+    asset = _assets.get(name)
+    if asset is not None and not ASSET_RELOAD:
+        return asset
+    path = ASSET_DIR / name
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        _assets.pop(name, None)
+        return None
+    if asset is not None and asset.mtime == mtime:
+        return asset
+    with _lock:
+        asset = _assets.get(name)
+        if asset is None or asset.mtime != mtime:
+            asset = _assets[name] = _build(name, path, mtime)
+    return asset
+
+
+def _data_uri(asset: Asset) -> str:
+    key = f"{asset.name}:{asset.fingerprint}"
+    uri = _data_uris.get(key)
+    if uri is None:
+        uri = f"data:{asset.mime};base64,{base64.b64encode(asset.data).decode()}"
+        with _lock:
+            for stale in [k for k in _data_uris if k.split(':', 1)[0] == asset.name]:
+                del _data_uris[stale]
+            _data_uris[key] = uri
+    return uri
+
+
+def style_tag(name: str) -> Optional[str]:
+    """``<style>`` element for a CSS asset, tagged with its fingerprint"""
+    asset = load_asset(name)
+    if asset is None:
+        return None
+    return f'<style data-asset="{asset.name}" data-fingerprint="{asset.fingerprint}">{asset.text}</style>'
+
+
+def asset_stats() -> Dict[str, Dict]:
+    """Source and served sizes of every asset loaded so far"""
+    return {
+        name: {
+            'fingerprint': asset.fingerprint,
+            'mime': asset.mime,
+            'source_bytes': asset.source_size,
+            'served_bytes': len(asset.data),
+        }
+        for name, asset in _assets.items()
+    }
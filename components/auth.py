@@ -3,14 +3,13 @@ Authentication Components for NCTracker
 Login forms and auth-related UI
 """
 
-from base64 import b64encode
-from pathlib import Path
-
 import streamlit as st
 from streamlit_extras.stylable_container import stylable_container
 
 from database import db
 
+from .assets import load_asset
+
 
 def show_login_form():
     """Display the streamlined login layout."""
@@ -20,18 +19,14 @@ def show_login_form():
     )
     background_extras = "background-size: cover; background-position: center;"
 
-    background_path = Path("assets/login_background.png")
-    if background_path.exists():
-        try:
-            encoded = b64encode(background_path.read_bytes()).decode()
-            background_layers = f"url('data:image/png;base64,{encoded}')"
-            background_extras = (
-                "background-size: contain;"
-                "background-repeat: no-repeat;"
-                "background-position: center center;"
-            )
-        except Exception:  # pragma: no cover - guard missing file edge cases
-            pass
+    background = load_asset("login_background.png")
+    if background:
+        background_layers = f"url('{background.data_uri}')"
+        background_extras = (
+            "background-size: contain;"
+            "background-repeat: no-repeat;"
+            "background-position: center center;"
+        )
 
     st.markdown("""
     <style>
@@ -0,0 +1,181 @@
+"""
+Cached Data Access for NCTracker
+Wraps the read calls made by the pages in st.cache_data so results are shared
+across reruns and sessions until a write changes the tables they read, and
+lets a page run independent reads concurrently
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+from database import db, DEFAULT_PAGE_SIZE, DEFAULT_POOL_SIZE, ROLLUP_TABLES, RowBatch
+
+# Upper bound on how long a result may be reused, per cached function; writes
+# made through this process invalidate sooner via db.data_version()
+DATA_CACHE_TTLS = {
+    'dashboard_stats': 300,
+    'recent_ncrs': 120,
+    'ncr_page': 60,
+    'all_tags': 600,
+    'tag_suggestions': 600,
+    'rollups': 600,
+}
+DATA_CACHE_ENTRIES = int(os.environ.get("NCTRACKER_DATA_CACHE_ENTRIES", "256"))
+# Reads in flight across all sessions; each holds a pooled connection, so
+# keep this below the pool size to leave room for writes
+DATA_LOAD_WORKERS = int(os.environ.get("NCTRACKER_DATA_LOAD_WORKERS", str(max(1, DEFAULT_POOL_SIZE // 2))))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def data_cache(name: str, tables: Iterable[str]) -> Callable:
+    """
+    Cache a data-access function with ``st.cache_data`` under the TTL in
+    DATA_CACHE_TTLS[name]. The data version of ``tables`` is part of the
+    cache key, so the first call after a committed write reloads.
+    """
+    tables = frozenset(tables)
+
+    def decorate(func: Callable) -> Callable:
+        @st.cache_data(ttl=DATA_CACHE_TTLS[name], max_entries=DATA_CACHE_ENTRIES, show_spinner=False)
+        def cached(data_version: tuple, *args, **kwargs):
+            return func(*args, **kwargs)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached(db.data_version(tables), *args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorate
+
+
+@data_cache('dashboard_stats', {'ncrs', 'ncr_stats'})
+def load_dashboard_stats() -> Dict:
+    """Dashboard KPIs from the materialized statistics"""
+    return db.get_dashboard_stats()
+
+
+@data_cache('recent_ncrs', {'ncrs', 'users'})
+def load_recent_ncrs(limit: int = 15) -> RowBatch:
+    """Most recently created NCRs for the Dashboard table"""
+    return db.get_recent_ncrs(limit)
+
+
+@data_cache('ncr_page', {'ncrs', 'users', 'ncr_tags', 'ncrs_fts'})
+def load_ncr_page(filters: Optional[Dict] = None, sort: str = 'newest',
+                  page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+    """One keyset page of the NCR list, in the 'card' projection"""
+    return db.get_ncr_page(filters, sort=sort, page_size=page_size, cursor=cursor, projection='card')
+
+
+@data_cache('all_tags', {'ncr_tags'})
+def load_all_tags() -> List[str]:
+    """Every distinct tag, for the NCR List filter"""
+    return db.get_all_tags()
+
+
+@data_cache('tag_suggestions', {'ncr_tags'})
+def load_tag_suggestions(limit: int = 12) -> List[str]:
+    """Most frequently used tags, for the New NCR form"""
+    return db.get_tag_suggestions(limit=limit)
+
+
+@data_cache('rollups', ROLLUP_TABLES.values())
+def load_rollups(group_by: Iterable[str] = ('month',), start=None, end=None,
+                 filters: Optional[Dict] = None) -> List[Dict]:
+    """Aggregated NCR counts from the analytics rollups"""
+    return db.get_rollups(group_by, start=start, end=end, filters=filters)
+
+
+def clear_data_cache():
+    """Drop every cached page result, e.g. after writes from another process"""
+    st.cache_data.clear()
+
+
+def _load_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DATA_LOAD_WORKERS, thread_name_prefix="nctracker-load")
+        return _executor
+
+
+class PageLoads:
+    """
+    Independent reads for one page rerun, run on the shared loader pool.
+    
+    ``submit`` starts a read and returns its Future; ``gather`` waits for
+    several and returns their results in order. Reads that have not started
+    when the batch is cancelled never run; reads already running finish, and
+    their results are dropped. Only use it for reads: workers do not see
+    writes the page has not committed.
+    """
+    
+    def __init__(self, page: str):
+        self.page = page
+        self._ctx = get_script_run_ctx()
+        self._futures: List[Future] = []
+        self.cancelled = False
+    
+    def _run(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        # Attach the session so st.cache_data and friends work in the worker
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, self._ctx)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # add_script_run_ctx(thread, None) would re-attach the current
+            # context; clear it so the idle worker doesn't keep the session alive
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+    
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Start ``func(*args, **kwargs)`` on the loader pool"""
+        if self.cancelled:
+            raise RuntimeError(f"Loads for {self.page} were cancelled")
+        future = _load_executor().submit(self._run, func, args, kwargs)
+        self._futures.append(future)
+        return future
+    
+    def gather(self, *futures: Future) -> List[Any]:
+        """Wait for ``futures`` and return their results, re-raising the first error"""
+        wait(futures)
+        return [future.result() for future in futures]
+    
+    def cancel(self):
+        """Cancel every read of this batch that has not started yet"""
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+    
+    def __enter__(self) -> 'PageLoads':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # A rerun or st.stop() unwinds the script with an exception; don't
+        # leave its queued reads occupying the pool
+        if exc_type is not None:
+            self.cancel()
+        return False
+
+
+def page_loads(page: str) -> PageLoads:
+    """
+    Start a batch of concurrent reads for this rerun of ``page``. Reads still
+    queued from the session's previous rerun of the page are cancelled.
+    """
+    key = f"_page_loads_{page}"
+    previous = st.session_state.get(key)
+    if previous is not None:
+        previous.cancel()
+    loads = st.session_state[key] = PageLoads(page)
+    return loads
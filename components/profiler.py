@@ -0,0 +1,186 @@
+"""
+Page Profiler for NCTracker
+Times the phases of a page rerun (db, transform, chart, render) and keeps the
+results in a process-wide ring buffer for the admin panel
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import streamlit as st
+
+PROFILE_PAGES = os.environ.get("NCTRACKER_PROFILE_PAGES", "0") == "1"
+PROFILE_BUFFER_SIZE = int(os.environ.get("NCTRACKER_PROFILE_BUFFER", "200"))
+PROFILE_PHASES = ('db', 'transform', 'chart', 'render')
+CAPTURE_MODES = ('cProfile', 'pyinstrument')
+
+_records: deque = deque(maxlen=PROFILE_BUFFER_SIZE)
+_records_lock = threading.Lock()
+
+
+class PageProfile:
+    """
+    Phase timer for one rerun. ``mark(phase)`` attributes the time from now
+    until the next mark to ``phase``; time before the first mark counts as
+    render. A disabled profile makes every call a no-op.
+    """
+
+    def __init__(self, page: str, enabled: bool, capture: Optional[str] = None):
+        self.page = page
+        self.enabled = enabled
+        self.capture = capture
+        # Read now: Streamlit calls made while a stop is unwinding raise again
+        self.user = (st.session_state.get('user') or {}).get('username')
+        self.phases: Dict[str, float] = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self._phase = 'render'
+        self._profiler = None
+        self._started = self._marked = time.perf_counter()
+        if capture == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.capture = 'cProfile'
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+        if self.capture == 'cProfile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def mark(self, phase: str) -> str:
+        """Switch to ``phase`` and return the phase that was active"""
+        previous = self._phase
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases[previous] = self.phases.get(previous, 0.0) + now - self._marked
+            self._marked = now
+            self._phase = phase
+        return previous
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Attribute the enclosed block to ``phase``, then resume the previous one"""
+        previous = self.mark(phase)
+        try:
+            yield
+        finally:
+            self.mark(previous)
+
+    def __enter__(self) -> 'PageProfile':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # st.stop(), st.rerun() and st.switch_page() end the script with an
+        # exception; record the rerun anyway and never leave a capture running
+        self.finish()
+        return False
+
+    def finish(self) -> Optional[Dict]:
+        """Close the rerun and store it in the ring buffer"""
+        if not self.enabled:
+            self._stop_capture()
+            return None
+        self.mark('render')
+        record = {
+            'page': self.page,
+            'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'user': self.user,
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 1),
+            **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            'capture': self.capture,
+            'profile': self._capture_report(),
+        }
+        self.enabled = False
+        with _records_lock:
+            _records.append(record)
+        return record
+
+    def _stop_capture(self):
+        if self._profiler is None:
+            return None
+        profiler, self._profiler = self._profiler, None
+        if self.capture == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+        return profiler
+
+    def _capture_report(self) -> Optional[str]:
+        profiler = self._stop_capture()
+        if profiler is None:
+            return None
+        if self.capture == 'pyinstrument':
+            return profiler.output_text(unicode=True, color=False)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+        return output.getvalue()
+
+
+def profiling_enabled() -> bool:
+    """Profiling is on for every session via env var, or per session via the admin toggle"""
+    return PROFILE_PAGES or bool(st.session_state.get('profile_pages'))
+
+
+def start_page_profile(page: str) -> PageProfile:
+    """
+    Begin timing this rerun of ``page``. Use it as a context manager around
+    the page body so reruns that end early are still recorded. A capture
+    requested from the admin panel applies to this rerun only.
+    """
+    capture = st.session_state.pop('profile_capture', None)
+    return PageProfile(page, enabled=profiling_enabled() or capture is not None, capture=capture)
+
+
+def profile_records(page: Optional[str] = None) -> List[Dict]:
+    """Buffered rerun timings, newest first, optionally for one page"""
+    with _records_lock:
+        records = list(_records)
+    return [record for record in reversed(records) if page is None or record['page'] == page]
+
+
+def profiler_panel(profile: PageProfile):
+    """
+    Finish ``profile`` and, for administrators, render the sidebar panel
+    with the latest reruns of this page
+    """
+    profile.finish()
+    user = st.session_state.get('user') or {}
+    if user.get('role') != 'admin':
+        return
+
+    with st.sidebar.expander("⏱️ Page Profiler"):
+        enabled = st.toggle(
+            "Profile my reruns",
+            value=profiling_enabled(),
+            disabled=PROFILE_PAGES,
+            help="Always on while NCTRACKER_PROFILE_PAGES=1" if PROFILE_PAGES else None,
+        )
+        st.session_state.profile_pages = enabled
+
+        mode = st.selectbox("Capture", CAPTURE_MODES, key="profile_capture_mode")
+        if st.button("Capture next rerun", use_container_width=True):
+            st.session_state.profile_capture = mode
+            st.rerun()
+
+        records = profile_records(profile.page)[:10]
+        if not records:
+            st.caption("No reruns recorded for this page yet.")
+            return
+        latest = records[0]
+        st.markdown(f"**Last rerun:** {latest['total_ms']:.0f} ms")
+        st.dataframe(
+            [{'Phase': phase, 'ms': latest[f"{phase}_ms"]} for phase in PROFILE_PHASES],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption("Recent reruns (ms): " + ", ".join(f"{record['total_ms']:.0f}" for record in records))
+        if latest['profile']:
+            st.code(latest['profile'][:6000], language="text")
@@ -5,39 +5,26 @@ Handles dark/light mode theming with persistence
 
 import streamlit as st
 import streamlit.components.v1 as components
-from pathlib import Path
+
+from .assets import load_asset, style_tag
 
 
 def inject_theme_css():
     """Inject the custom modern theme CSS into the app"""
-    css_file = Path(__file__).parent.parent / "assets" / "theme_modern.css"
+    css = style_tag("theme_modern.css")
     
-    if css_file.exists():
-        with open(css_file, "r", encoding="utf-8") as f:
-            css_content = f.read()
-        
-        st.markdown(f"""
-        <style>
-        {css_content}
-        </style>
-        """, unsafe_allow_html=True)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
     else:
         st.warning("Theme CSS file not found")
 
 
 def inject_theme_js():
     """Inject theme toggle JavaScript"""
-    js_file = Path(__file__).parent.parent / "assets" / "theme.js"
+    js_asset = load_asset("theme.js")
     
-    if js_file.exists():
-        with open(js_file, "r", encoding="utf-8") as f:
-            js_content = f.read()
-        
-        components.html(f"""
-        <script>
-        {js_content}
-        </script>
-        """, height=0)
+    if js_asset:
+        components.html(f"<script>{js_asset.text}</script>", height=0)
 
 
 def theme_toggle():
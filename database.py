@@ -5,176 +5,2164 @@ Handles all database operations, schema creation, and data management
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Callable, Union
 from pathlib import Path
 import hashlib
+import base64
+import math
+import copy
+import re
+import string
+import sys
+from collections import OrderedDict, deque, namedtuple
+
+
+DEFAULT_POOL_SIZE = int(os.environ.get("NCTRACKER_DB_POOL_SIZE", "8"))
+DEFAULT_POOL_TIMEOUT = float(os.environ.get("NCTRACKER_DB_POOL_TIMEOUT", "30"))
+DEFAULT_CACHE_TTL = float(os.environ.get("NCTRACKER_QUERY_CACHE_TTL", "30"))
+DEFAULT_CACHE_MB = float(os.environ.get("NCTRACKER_QUERY_CACHE_MB", "64"))
+DEFAULT_CACHE_ENTRIES = int(os.environ.get("NCTRACKER_QUERY_CACHE_ENTRIES", "1024"))
+QUERY_TIMING = os.environ.get("NCTRACKER_QUERY_TIMING", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("NCTRACKER_SLOW_QUERY_MS", "250"))
+SLOW_QUERY_LOG = os.environ.get("NCTRACKER_SLOW_QUERY_LOG", "logs/slow_queries.log")
+
+# Storage profiles applied to every pooled connection. ``journal_mode`` is
+# persistent in the database file; the remaining PRAGMAs are per-connection.
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # SQLite defaults: rollback journal, readers block behind writers
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout_ms': 5000,
+        'busy_retries': 3,
+        'busy_backoff_ms': 50,
+    },
+    # Write-ahead log: readers never block behind the single writer
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout_ms': 5000,
+        'busy_retries': 5,
+        'busy_backoff_ms': 50,
+    },
+}
+DEFAULT_STORAGE_PROFILE = os.environ.get("NCTRACKER_DB_PROFILE", "wal")
+
+_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+_TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
+
+
+def resolve_storage_profile(profile: Union[str, Dict[str, Any], None] = None) -> Dict[str, Any]:
+    """
+    Build a validated storage profile.
+
+    ``profile`` may be a profile name, a dict of overrides (optionally naming a
+    base profile under ``'name'``), or None for the configured default.
+    """
+    if profile is None:
+        profile = DEFAULT_STORAGE_PROFILE
+    overrides: Dict[str, Any] = {}
+    if isinstance(profile, dict):
+        overrides = dict(profile)
+        profile = overrides.pop('name', DEFAULT_STORAGE_PROFILE)
+
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile}'. Choose from: {', '.join(STORAGE_PROFILES)}")
+
+    resolved = dict(STORAGE_PROFILES[profile])
+    unknown = set(overrides) - set(resolved)
+    if unknown:
+        raise ValueError(f"Unknown storage profile settings: {', '.join(sorted(unknown))}")
+    resolved.update(overrides)
+    resolved['name'] = profile
+
+    for key, allowed in (('journal_mode', _JOURNAL_MODES),
+                         ('synchronous', _SYNCHRONOUS_MODES),
+                         ('temp_store', _TEMP_STORES)):
+        resolved[key] = str(resolved[key]).upper()
+        if resolved[key] not in allowed:
+            raise ValueError(f"Invalid {key} '{resolved[key]}'")
+    for key in ('cache_size', 'mmap_size', 'busy_timeout_ms', 'busy_retries', 'busy_backoff_ms'):
+        resolved[key] = int(resolved[key])
+    return resolved
+
+
+# Secondary indexes maintained by init_database: (name, table, column list).
+# The list view pulls newest-first pages and filters on status / level / owner,
+# the detail view loads child rows per NCR, and the dashboard aggregates by
+# status, level and closure time.
+MANAGED_INDEXES = [
+    ('idx_ncrs_created_at_cover', 'ncrs',
+     'created_at, id, ncr_number, title, status, nc_level, created_by'),
+    ('idx_ncrs_status_created_at', 'ncrs', 'status, created_at'),
+    ('idx_ncrs_nc_level_created_at', 'ncrs', 'nc_level, created_at'),
+    ('idx_ncrs_nc_level_status', 'ncrs', 'nc_level, status'),
+    ('idx_ncrs_created_by_created_at', 'ncrs', 'created_by, created_at'),
+    ('idx_ncrs_assigned_to', 'ncrs', 'assigned_to'),
+    ('idx_ncrs_status_closed_at', 'ncrs', 'status, closed_at, created_at'),
+    ('idx_ncrs_nc_level_sort', 'ncrs', 'COALESCE(nc_level, 99), created_at, id'),
+    ('idx_comments_ncr_id_created_at', 'comments', 'ncr_id, created_at'),
+    ('idx_attachments_ncr_id_uploaded_at', 'attachments', 'ncr_id, uploaded_at'),
+    ('idx_status_history_ncr_id_created_at', 'status_history', 'ncr_id, created_at'),
+    ('idx_mentions_comment_id', 'mentions', 'comment_id'),
+    ('idx_mentions_user_notified', 'mentions', 'mentioned_user_id, notified'),
+    ('idx_ncr_tags_tag', 'ncr_tags', 'tag, ncr_id'),
+]
+
+# (ncr_id, tag) rows parsed from the JSON ``tags`` column of ``{ref}``, which
+# is a trigger's ``new`` row or an alias joined in through ``{source}``.
+# Blank and non-string entries are skipped; tags are trimmed.
+TAG_VALUES_SQL = '''
+    SELECT DISTINCT {ref}.id, trim(t.value)
+    FROM {source}json_each(CASE WHEN json_valid({ref}.tags) THEN {ref}.tags ELSE '[]' END) t
+    WHERE t.type = 'text' AND trim(t.value) != ''
+'''
+
+
+NCR_BY_ID_QUERY = '''
+    SELECT n.*, u1.full_name as created_by_name, u2.full_name as assigned_to_name
+    FROM ncrs n
+    LEFT JOIN users u1 ON n.created_by = u1.id
+    LEFT JOIN users u2 ON n.assigned_to = u2.id
+    WHERE n.id = ?
+'''
+
+COMMENTS_QUERY = '''
+    SELECT c.*, u.full_name as user_name, u.username
+    FROM comments c
+    JOIN users u ON c.user_id = u.id
+    WHERE c.ncr_id = ?
+    ORDER BY c.created_at ASC
+'''
+
+ATTACHMENTS_QUERY = '''
+    SELECT a.*, u.full_name as user_name
+    FROM attachments a
+    JOIN users u ON a.user_id = u.id
+    WHERE a.ncr_id = ?
+    ORDER BY a.uploaded_at DESC
+'''
+
+STATUS_HISTORY_QUERY = '''
+    SELECT h.*, u.full_name as user_name
+    FROM status_history h
+    LEFT JOIN users u ON h.user_id = u.id
+    WHERE h.ncr_id = ?
+    ORDER BY h.created_at ASC
+'''
+
+MENTIONS_QUERY = '''
+    SELECT m.*, u.full_name as user_name, u.username
+    FROM comments c
+    JOIN mentions m ON m.comment_id = c.id
+    JOIN users u ON m.mentioned_user_id = u.id
+    WHERE c.ncr_id = ?
+    ORDER BY c.created_at ASC
+'''
+
+# Tables a cached NCR bundle is assembled from
+NCR_BUNDLE_TABLES = frozenset({'ncrs', 'users', 'comments', 'attachments', 'status_history', 'mentions'})
+
+DASHBOARD_STATS_QUERIES = {
+    'total_ncrs': "SELECT COUNT(*) FROM ncrs",
+    'status_counts': "SELECT status, COUNT(*) FROM ncrs GROUP BY status",
+    'nc_level_counts': "SELECT nc_level, COUNT(*) FROM ncrs WHERE nc_level IS NOT NULL GROUP BY nc_level",
+    'recent_ncrs': "SELECT COUNT(*) FROM ncrs WHERE created_at >= date('now', 'localtime', '-30 days')",
+    'prior_recent_ncrs': '''
+        SELECT COUNT(*) FROM ncrs
+        WHERE created_at >= date('now', 'localtime', '-60 days')
+          AND created_at < date('now', 'localtime', '-30 days')
+    ''',
+    'open_ncrs': "SELECT COUNT(*) FROM ncrs WHERE status IS NOT 'CLOSED'",
+    'critical_open_ncrs': "SELECT COUNT(*) FROM ncrs WHERE nc_level = 1 AND status IS NOT 'CLOSED'",
+    'avg_resolution_days': '''
+        SELECT AVG(julianday(closed_at) - julianday(created_at)) as avg_days
+        FROM ncrs WHERE status = 'CLOSED' AND closed_at IS NOT NULL
+    ''',
+}
+
+
+# Full-text search over NCR content. Column order matters: it is shared by the
+# FTS table, the sync triggers and the BM25 weights below.
+SEARCH_COLUMNS = [
+    'ncr_number', 'title', 'part_number', 'problem_is', 'problem_should_be',
+    'disposition_instructions', 'disposition_justification', 'comments', 'tags',
+]
+SEARCH_WEIGHTS = [10.0, 5.0, 4.0, 2.0, 1.5, 1.0, 1.0, 0.75, 3.0]
+SEARCH_INDEXED_FIELDS = [column for column in SEARCH_COLUMNS if column != 'comments']
+SEARCH_COMMENTS_SQL = "(SELECT group_concat(content, ' ') FROM comments WHERE ncr_id = {ref})"
+
+
+# Sortable NCR fields and the SQL expression each sorts on. Nullable columns
+# are coalesced so keyset comparisons never meet a NULL.
+NCR_SORT_FIELDS = {
+    'id': 'n.id',
+    'ncr_number': 'n.ncr_number',
+    'title': 'n.title',
+    'status': "COALESCE(n.status, '')",
+    'nc_level': 'COALESCE(n.nc_level, 99)',
+    'priority': 'COALESCE(n.priority, 99)',
+    'site': "COALESCE(n.site, '')",
+    'supplier': "COALESCE(n.supplier, '')",
+    'part_number': "COALESCE(n.part_number, '')",
+    'created_at': 'n.created_at',
+    'updated_at': "COALESCE(n.updated_at, '')",
+    'closed_at': "COALESCE(n.closed_at, '')",
+    'score': 's.score',
+}
+UNIQUE_SORT_FIELDS = {'id', 'ncr_number'}
+
+# Named sort orders as (field, direction) specs. 'relevance' ranks by the
+# full-text score and only applies when a search term is present.
+NCR_SORT_ORDERS = {
+    'newest': [('created_at', 'desc')],
+    'oldest': [('created_at', 'asc')],
+    'ncr_number': [('ncr_number', 'asc')],
+    'nc_level': [('nc_level', 'desc'), ('created_at', 'desc')],
+    'relevance': [('score', 'asc')],
+}
+
+
+def resolve_sort(sort: Union[str, List[tuple], None]) -> tuple:
+    """
+    Normalize a sort spec into ``(signature, keys)``.
+
+    ``sort`` is a NCR_SORT_ORDERS name or a list of ``(field, 'asc'|'desc')``
+    pairs over NCR_SORT_FIELDS. ``keys`` are ``(sql, descending)`` pairs ending
+    on a unique key (``id`` is appended when needed) so every row has a
+    distinct position; ``signature`` identifies the order inside cursors.
+    """
+    spec = NCR_SORT_ORDERS.get(sort or 'newest') if isinstance(sort, str) or sort is None else sort
+    if not spec:
+        raise ValueError(f"Unknown sort '{sort}'. Choose from: {', '.join(NCR_SORT_ORDERS)}")
+    
+    fields = []
+    for item in spec:
+        field, direction = (item, 'asc') if isinstance(item, str) else item
+        direction = str(direction).lower()
+        if field not in NCR_SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{field}'. Choose from: {', '.join(NCR_SORT_FIELDS)}")
+        if direction not in ('asc', 'desc'):
+            raise ValueError(f"Sort direction for '{field}' must be 'asc' or 'desc'")
+        fields.append((field, direction))
+    if fields[-1][0] not in UNIQUE_SORT_FIELDS:
+        fields.append(('id', fields[-1][1]))
+    
+    signature = ','.join(f"{field}:{direction}" for field, direction in fields)
+    keys = [(NCR_SORT_FIELDS[field], direction == 'desc') for field, direction in fields]
+    return signature, keys
+
+
+# Columns that can be filtered by exact value (or any of a list of values)
+NCR_FILTER_FIELDS = [
+    'status', 'nc_level', 'created_by', 'assigned_to', 'site', 'supplier',
+    'problem_category', 'disposition_action',
+]
+
+
+def in_condition(expr: str, value: Any) -> tuple:
+    """``expr = ?`` for a scalar, ``expr IN (...)`` for a list or tuple"""
+    if isinstance(value, (list, tuple, set)):
+        values = list(value)
+        return f"{expr} IN ({', '.join('?' for _ in values)})", values
+    return f"{expr} = ?", [value]
+
+
+# Timestamps are stored as local-time ISO 8601 with a 'T' separator and
+# second precision, so they sort and compare correctly as text
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+NOW_SQL = f"strftime('{TIMESTAMP_FORMAT}', 'now', 'localtime')"
+TIMESTAMP_COLUMNS = {
+    'users': ['created_at'],
+    'ncrs': ['created_at', 'updated_at', 'closed_at'],
+    'comments': ['created_at'],
+    'attachments': ['uploaded_at'],
+    'status_history': ['created_at'],
+    'mentions': ['created_at'],
+}
+
+
+def _stale_timestamp_sql(column: str) -> str:
+    """SQL condition: ``column`` holds a parseable, non-canonical timestamp"""
+    return (
+        f"({column} IS NOT NULL"
+        f" AND (length({column}) != 19 OR substr({column}, 11, 1) != 'T')"
+        f" AND strftime('{TIMESTAMP_FORMAT}', {column}) IS NOT NULL)"
+    )
+
+
+def _canonical_timestamp_sql(column: str) -> str:
+    """
+    SQL expression for ``column`` in canonical form. Space-separated values
+    come from CURRENT_TIMESTAMP column defaults and are UTC, so they are
+    shifted to local time; other ISO values only lose their fractional
+    seconds. Canonical and unparseable values are left alone.
+    """
+    return f'''CASE
+        WHEN NOT {_stale_timestamp_sql(column)} THEN {column}
+        WHEN substr({column}, 11, 1) = ' ' THEN strftime('{TIMESTAMP_FORMAT}', {column}, 'localtime')
+        ELSE strftime('{TIMESTAMP_FORMAT}', {column})
+    END'''
+
+
+def now_timestamp() -> str:
+    """The current local time in canonical form"""
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+def canonical_timestamp(value: Any) -> Optional[str]:
+    """
+    Normalize a datetime, date or ISO 8601 string to the canonical stored
+    form. Aware values are converted to local time. Raises ValueError for
+    anything unparseable.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a stored timestamp into a naive datetime, or None if it is not one"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip()) if value else None
+    except ValueError:
+        return None
+
+
+# Columns available to column-selecting readers such as iter_ncrs
+NCR_EXPORT_COLUMNS = {
+    'id': 'n.id',
+    **{column: f'n.{column}' for column in [
+        'ncr_number', 'title', 'status', 'priority', 'site', 'part_number', 'part_number_rev',
+        'quantity_affected', 'units_affected', 'project_affected', 'serial_number', 'other_id',
+        'po_number', 'supplier', 'build_group_operation', 'problem_is', 'problem_should_be',
+        'is_contained', 'how_contained', 'containment_justification', 'nc_level', 'capa_required',
+        'capa_number', 'qe_assigned', 'nc_owner_assigned', 'external_notification_required',
+        'external_notification_method', 'problem_category', 'disposition_action',
+        'disposition_instructions', 'disposition_justification', 'required_approvals',
+        'correction_actions', 'evidence_of_completion', 'tags', 'closure_date', 'qe_audit_complete',
+        'created_by', 'assigned_to', 'created_at', 'updated_at', 'closed_at',
+    ]},
+    'created_by_name': 'u1.full_name',
+    'assigned_to_name': 'u2.full_name',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+# Named column sets for NCR readers. List views use 'summary' or 'card' so
+# the long free-text columns never leave SQLite; 'full' is every column.
+NCR_SNIPPET_LENGTH = 150
+NCR_SNIPPET_COLUMNS = {
+    'problem_snippet': f'''
+        CASE WHEN length(n.problem_is) > {NCR_SNIPPET_LENGTH}
+             THEN substr(n.problem_is, 1, {NCR_SNIPPET_LENGTH}) || '...'
+             ELSE n.problem_is END''',
+}
+NCR_PROJECTIONS = {
+    'summary': ['id', 'ncr_number', 'title', 'status', 'nc_level', 'created_at', 'created_by_name'],
+    'card': ['id', 'ncr_number', 'title', 'status', 'nc_level', 'created_at', 'created_by_name',
+             'part_number', 'part_number_rev', 'tags', 'problem_snippet'],
+    'full': None,
+}
+NCR_FULL_SELECT = 'n.*, u1.full_name as created_by_name, u2.full_name as assigned_to_name'
+
+
+def projection_select(projection: str) -> str:
+    """SELECT list for a named projection (see NCR_PROJECTIONS)"""
+    if projection not in NCR_PROJECTIONS:
+        raise ValueError(f"Unknown NCR projection '{projection}'; use one of {', '.join(NCR_PROJECTIONS)}")
+    columns = NCR_PROJECTIONS[projection]
+    if columns is None:
+        return NCR_FULL_SELECT
+    expressions = {**NCR_EXPORT_COLUMNS, **NCR_SNIPPET_COLUMNS}
+    return ', '.join(f"{expressions[column]} AS {column}" for column in columns)
+
+DEFAULT_PAGE_SIZE = 25
+COUNT_ESTIMATE_CAP = 10000
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Serialize the sort key of the last row on a page into an opaque token"""
+    payload = json.dumps({'sort': sort, 'after': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str, key_count: int) -> List[Any]:
+    """Recover the sort key values from a cursor issued for the same sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        values = payload['after']
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+    if payload.get('sort') != sort or len(values) != key_count:
+        raise ValueError(f"Pagination cursor was not issued for sort '{sort}'")
+    return values
+
+
+def keyset_condition(keys: List[tuple], values: List[Any]) -> tuple:
+    """
+    WHERE clause selecting rows strictly after ``values`` in ``keys`` order,
+    expanded per key so mixed ASC/DESC orders work. The leading-key bound
+    lets SQLite start the index range at the cursor.
+    """
+    leading_expr, leading_desc = keys[0]
+    clauses = [f"{leading_expr} {'<=' if leading_desc else '>='} ?"]
+    params = [values[0]]
+    alternatives = []
+    for position, (expr, descending) in enumerate(keys):
+        parts = [f"{prior} = ?" for prior, _ in keys[:position]]
+        parts.append(f"{expr} {'<' if descending else '>'} ?")
+        alternatives.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:position + 1])
+    clauses.append('(' + ' OR '.join(alternatives) + ')')
+    return ' AND '.join(clauses), params
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match,
+    each as a quoted prefix term so punctuation cannot inject query syntax.
+    """
+    terms = []
+    for word in text.replace('"', ' ').split():
+        word = word.strip()
+        if word:
+            terms.append(f'"{word}"*')
+    return ' '.join(terms)
+
+
+TAG_COUNTS_QUERY = '''
+    SELECT tag, COUNT(*) as count
+    FROM ncr_tags
+    {where}
+    GROUP BY tag
+    ORDER BY count DESC, lower(tag)
+    {limit}
+'''
+
+
+# Metrics held in ncr_stats and maintained by triggers on ncrs. Daily creation
+# counts live under 'created_day' so the 30-day window is a short range read.
+MATERIALIZED_STATS_METRICS = ('total', 'status', 'nc_level', 'resolution')
+MATERIALIZED_STATS_QUERY = f'''
+    SELECT metric, key, value FROM ncr_stats
+    WHERE metric IN ({', '.join(repr(metric) for metric in MATERIALIZED_STATS_METRICS)})
+'''
+RECENT_NCRS_QUERY = '''
+    SELECT COALESCE(SUM(value), 0) FROM ncr_stats
+    WHERE metric = 'created_day' AND key >= date('now', 'localtime', '-30 days')
+'''
+PRIOR_RECENT_NCRS_QUERY = '''
+    SELECT COALESCE(SUM(value), 0) FROM ncr_stats
+    WHERE metric = 'created_day'
+      AND key >= date('now', 'localtime', '-60 days') AND key < date('now', 'localtime', '-30 days')
+'''
+CRITICAL_OPEN_NCRS_QUERY = DASHBOARD_STATS_QUERIES['critical_open_ncrs']
+
+
+def _stats_delta_statements(row: str, sign: int) -> List[str]:
+    """SQL adding (sign=1) or removing (sign=-1) one NCR row's contribution"""
+    upsert = '''
+        INSERT INTO ncr_stats (metric, key, value)
+        SELECT {metric}, {key}, {value} {where}
+        ON CONFLICT (metric, key) DO UPDATE SET value = value + excluded.value;
+    '''
+    closed = f"WHERE {row}.status = 'CLOSED' AND {row}.closed_at IS NOT NULL"
+    return [
+        upsert.format(metric="'total'", key="''", value=sign, where=''),
+        upsert.format(metric="'status'", key=f"COALESCE({row}.status, '')", value=sign, where=''),
+        upsert.format(metric="'nc_level'", key=f"CAST({row}.nc_level AS TEXT)", value=sign,
+                      where=f"WHERE {row}.nc_level IS NOT NULL"),
+        upsert.format(metric="'created_day'", key=f"substr({row}.created_at, 1, 10)", value=sign,
+                      where=f"WHERE {row}.created_at IS NOT NULL"),
+        upsert.format(metric="'resolution'", key="'count'", value=sign, where=closed),
+        upsert.format(metric="'resolution'", key="'days_sum'",
+                      value=f"{sign} * (julianday({row}.closed_at) - julianday({row}.created_at))",
+                      where=closed),
+    ]
+
+
+
+# Analytics rollups: NCR counts per created day/month and dimension combination,
+# kept current by triggers on ncrs. Dimensions form the primary key, so missing
+# values are stored as a sentinel ('' for text, 0 for nc_level, -1 for the
+# resolution days of an unresolved NCR) and mapped back to None on read.
+ROLLUP_TABLES = {'day': 'ncr_rollups_daily', 'month': 'ncr_rollups_monthly'}
+ROLLUP_PERIODS = {'day': 10, 'month': 7, 'year': 4}
+ROLLUP_RESOLVED = "{row}.status = 'CLOSED' AND {row}.closed_at IS NOT NULL"
+ROLLUP_DIMENSIONS = {
+    'status': "COALESCE({row}.status, '')",
+    'nc_level': "COALESCE({row}.nc_level, 0)",
+    'problem_category': "COALESCE({row}.problem_category, '')",
+    'disposition_action': "COALESCE({row}.disposition_action, '')",
+    'site': "COALESCE({row}.site, '')",
+    'supplier': "COALESCE({row}.supplier, '')",
+    'resolution_days': (
+        f"CASE WHEN {ROLLUP_RESOLVED} "
+        "THEN CAST(julianday({row}.closed_at) - julianday({row}.created_at) AS INTEGER) ELSE -1 END"
+    ),
+}
+ROLLUP_UNSET = {'nc_level': 0, 'resolution_days': -1}
+ROLLUP_MEASURES = {
+    'ncr_count': '1',
+    'closed_count': "CASE WHEN {row}.status = 'CLOSED' THEN 1 ELSE 0 END",
+    'resolved_count': f"CASE WHEN {ROLLUP_RESOLVED} THEN 1 ELSE 0 END",
+    'resolution_days_sum': (
+        f"CASE WHEN {ROLLUP_RESOLVED} "
+        "THEN julianday({row}.closed_at) - julianday({row}.created_at) ELSE 0 END"
+    ),
+}
+ROLLUP_SOURCE_COLUMNS = ['status', 'nc_level', 'problem_category', 'disposition_action',
+                         'site', 'supplier', 'created_at', 'closed_at']
+
+
+def _rollup_source_query(grain: str) -> str:
+    """Full recompute of one rollup table from ncrs"""
+    keys = [f"substr(n.created_at, 1, {ROLLUP_PERIODS[grain]}) AS bucket"]
+    keys += [f"{expr.format(row='n')} AS {dimension}" for dimension, expr in ROLLUP_DIMENSIONS.items()]
+    sums = [f"SUM({expr.format(row='n')}) AS {measure}" for measure, expr in ROLLUP_MEASURES.items()]
+    return f'''
+        SELECT {', '.join(keys + sums)} FROM ncrs n
+        WHERE n.created_at IS NOT NULL
+        GROUP BY {', '.join(str(position) for position in range(1, len(keys) + 1))}
+    '''
+
+
+def _rollup_delta_statements(row: str, sign: int) -> List[str]:
+    """SQL adding (sign=1) or removing (sign=-1) one NCR row from every rollup"""
+    dimensions = ', '.join(ROLLUP_DIMENSIONS)
+    measures = ', '.join(ROLLUP_MEASURES)
+    values = ', '.join(f"{sign} * ({expr.format(row=row)})" for expr in ROLLUP_MEASURES.values())
+    updates = ', '.join(f"{measure} = {measure} + excluded.{measure}" for measure in ROLLUP_MEASURES)
+    statements = []
+    for grain, table in ROLLUP_TABLES.items():
+        bucket = f"substr({row}.created_at, 1, {ROLLUP_PERIODS[grain]})"
+        keys = ', '.join([bucket] + [expr.format(row=row) for expr in ROLLUP_DIMENSIONS.values()])
+        statements.append(f'''
+            INSERT INTO {table} (bucket, {dimensions}, {measures})
+            SELECT {keys}, {values} WHERE {row}.created_at IS NOT NULL
+            ON CONFLICT (bucket, {dimensions}) DO UPDATE SET {updates};
+        ''')
+        if sign < 0:
+            matches = ' AND '.join([f"bucket = {bucket}"] + [
+                f"{dimension} = {expr.format(row=row)}" for dimension, expr in ROLLUP_DIMENSIONS.items()
+            ])
+            statements.append(f"DELETE FROM {table} WHERE {matches} AND ncr_count <= 0;")
+    return statements
+
+# NCR numbering: {seq} is the per-scope counter, {site} and {year} select the scope
+NCR_NUMBER_FORMAT = os.environ.get("NCTRACKER_NCR_NUMBER_FORMAT", "NCR-{seq:04d}")
+NCR_SITE_CODES = json.loads(os.environ.get("NCTRACKER_NCR_SITE_CODES", "{}"))
+
+
+def site_code(site: Optional[str]) -> str:
+    """Short code for a site, e.g. 'Site A - Main Facility' -> 'SITEA'"""
+    if not site:
+        return 'NA'
+    if site in NCR_SITE_CODES:
+        return NCR_SITE_CODES[site]
+    return re.sub(r'[^A-Za-z0-9]', '', site.split(' - ')[0]).upper() or 'NA'
+
+
+def ncr_number_scope(site: Optional[str] = None, year: Optional[int] = None,
+                     number_format: str = NCR_NUMBER_FORMAT) -> tuple:
+    """
+    Split ``number_format`` around ``{seq}`` for a site/year, returning
+    ``(prefix, seq_spec, suffix)``. ``prefix + '#' + suffix`` names the
+    sequence, so every site/year combination the format distinguishes
+    gets its own counter.
+    """
+    values = {'site': site_code(site), 'year': year or datetime.now().year}
+    parts = ['', None, '']
+    for literal, field, spec, conversion in string.Formatter().parse(number_format):
+        side = 0 if parts[1] is None else 2
+        parts[side] += literal
+        if field is None:
+            continue
+        if field == 'seq':
+            if parts[1] is not None:
+                raise ValueError("NCR number format may contain {seq} only once")
+            parts[1] = spec or 'd'
+        else:
+            parts[side] += format(values[field], spec)
+    if parts[1] is None:
+        raise ValueError("NCR number format must contain {seq}")
+    return tuple(parts)
+
+
+def ncr_number_sequence(number: Optional[str], site: Optional[str] = None, year: Optional[int] = None,
+                        number_format: str = NCR_NUMBER_FORMAT) -> Optional[int]:
+    """Counter value of ``number`` in its site/year scope, or None if it doesn't follow the format"""
+    prefix, _, suffix = ncr_number_scope(site, year, number_format)
+    number = str(number or '')
+    if not number.startswith(prefix) or not number.endswith(suffix):
+        return None
+    digits = number[len(prefix):len(number) - len(suffix)]
+    return int(digits) if digits.isdigit() else None
+
+
+def _issued_sequence_sql(prefix: str, suffix: str) -> tuple:
+    """``(sql, params)`` selecting the highest counter value already used in ncrs for a scope"""
+    suffix_condition = "AND substr(ncr_number, -?) = ?" if suffix else ""
+    suffix_params = (len(suffix), suffix) if suffix else ()
+    sql = f'''
+        SELECT COALESCE(MAX(CAST(substr(ncr_number, ?) AS INTEGER)), 0)
+        FROM ncrs
+        WHERE ncr_number >= ? AND ncr_number < ?
+          AND substr(ncr_number, ?, 1) BETWEEN '0' AND '9' {suffix_condition}
+    '''
+    return sql, (len(prefix) + 1, prefix, prefix + '\uffff', len(prefix) + 1) + suffix_params
+
+
+# Columns accepted by bulk_create_ncrs; list values are stored as JSON text
+NCR_IMPORT_COLUMNS = [
+    'ncr_number', 'title', 'status', 'priority', 'site', 'part_number', 'part_number_rev',
+    'quantity_affected', 'units_affected', 'project_affected', 'serial_number', 'other_id',
+    'po_number', 'supplier', 'build_group_operation', 'problem_is', 'problem_should_be',
+    'is_contained', 'how_contained', 'containment_justification', 'nc_level', 'capa_required',
+    'capa_number', 'qe_assigned', 'nc_owner_assigned', 'external_notification_required',
+    'external_notification_method', 'problem_category', 'disposition_action',
+    'disposition_instructions', 'disposition_justification', 'required_approvals',
+    'correction_actions', 'evidence_of_completion', 'tags', 'closure_date', 'qe_audit_complete',
+    'created_by', 'assigned_to', 'created_at', 'updated_at', 'closed_at',
+]
+NCR_JSON_COLUMNS = {'required_approvals', 'correction_actions', 'tags'}
+NCR_IMPORT_DEFAULTS = {
+    'status': "'NEW'",
+    'priority': '3',
+    'created_at': NOW_SQL,
+    'updated_at': NOW_SQL,
+}
+NCR_BULK_INSERT_QUERY = f'''
+    INSERT INTO ncrs ({', '.join(NCR_IMPORT_COLUMNS)})
+    VALUES ({', '.join(
+        f"COALESCE(?, {NCR_IMPORT_DEFAULTS[column]})" if column in NCR_IMPORT_DEFAULTS else '?'
+        for column in NCR_IMPORT_COLUMNS
+    )})
+'''
+# Insert triggers dropped during a deferred bulk load; the ensure_* methods
+# rebuild the derived table whenever they find its trigger missing
+BULK_LOAD_TRIGGERS = ['ncr_tags_ai', 'ncrs_fts_ai', 'ncr_stats_ai', 'ncr_rollups_ai']
+BULK_LOAD_INDEXED_TABLES = {'ncrs', 'ncr_tags'}
+BULK_CHUNK_SIZE = 1000
+BULK_DEFER_THRESHOLD = 5000
+
+# Versioned schema migrations as (version, description, method). migrate()
+# applies those above PRAGMA user_version in order, each in its own
+# transaction. Append new entries and never renumber shipped ones; a
+# method may be listed again (e.g. _migrate_indexes after adding to
+# MANAGED_INDEXES). Steps must be idempotent: databases created before
+# versioning run every one of them once over their existing schema.
+SCHEMA_MIGRATIONS = [
+    (1, 'base tables', '_migrate_base_tables'),
+    (2, 'ncrs.tags column', '_migrate_tags_column'),
+    (3, 'normalized ncr_tags', '_migrate_ncr_tags'),
+    (4, 'NCR number sequences', '_migrate_ncr_sequences'),
+    (5, 'canonical timestamps', '_migrate_canonical_timestamps'),
+    (6, 'managed indexes', '_migrate_indexes'),
+    (7, 'full-text search', '_migrate_search_index'),
+    (8, 'dashboard statistics', '_migrate_dashboard_stats'),
+    (9, 'analytics rollups', '_migrate_analytics_rollups'),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+# Rows rewritten per transaction by batched backfills
+MIGRATION_CHUNK_SIZE = int(os.environ.get("NCTRACKER_MIGRATION_CHUNK_SIZE", "5000"))
+
+
+class QueryPlanError(AssertionError):
+    """Raised when a hot query's plan falls back to a full table scan"""
+
+
+def _is_busy_error(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_busy(method: Callable) -> Callable:
+    """
+    Retry a DatabaseManager method with exponential backoff when SQLite reports
+    lock contention that outlasted ``busy_timeout``.
+
+    Only the outermost call retries: a nested call inside an open transaction
+    re-raises so the enclosing operation can be replayed as a whole.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = self.storage_profile
+        attempt = 0
+        while True:
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                if (not _is_busy_error(exc) or attempt >= profile['busy_retries']
+                        or self.pool.holds_connection()):
+                    raise
+                delay = profile['busy_backoff_ms'] * (2 ** attempt) / 1000.0
+                attempt += 1
+                self.busy_retries += 1
+                time.sleep(delay)
+    return wrapper
+
+
+# Tables whose contents change when another table is written, via triggers
+DERIVED_TABLES = {
+    'ncrs': {'ncr_tags', 'ncrs_fts', 'ncr_stats', *ROLLUP_TABLES.values()},
+    'comments': {'ncrs_fts'},
+}
+CACHEABLE_TABLES = [
+    'users', 'ncrs', 'comments', 'attachments', 'status_history', 'mentions',
+    'ncr_tags', 'ncrs_fts', 'ncr_stats', *ROLLUP_TABLES.values(),
+]
+_TABLE_PATTERNS = {table: re.compile(rf'\b{table}\b', re.IGNORECASE) for table in CACHEABLE_TABLES}
+_WRITE_TARGET = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)',
+    re.IGNORECASE
+)
+
+
+def tables_read_by(query: str) -> frozenset:
+    """Known tables referenced by a SELECT"""
+    return frozenset(table for table, pattern in _TABLE_PATTERNS.items() if pattern.search(query))
+
+
+def tables_written_by(query: str) -> set:
+    """Tables changed by a write statement, including trigger-maintained ones"""
+    match = _WRITE_TARGET.match(query)
+    if not match:
+        # Unrecognized statement: assume it may touch anything
+        return set(CACHEABLE_TABLES)
+    table = match.group(1).lower()
+    return {table} | DERIVED_TABLES.get(table, set())
+
+
+@lru_cache(maxsize=64)
+def _record_type(columns: tuple) -> type:
+    return namedtuple('Record', columns, rename=True)
+
+
+class RowBatch:
+    """
+    Column-oriented, read-only query result.
+
+    Values are held as one tuple per column, so a result costs a few objects
+    per column rather than a dict per row, and a cached batch is shared
+    without copying. Iterating yields named-tuple records; ``to_pandas``
+    hands the columns to pandas through Arrow. Values are returned as stored
+    (JSON columns such as ``tags`` stay text).
+    """
+
+    __slots__ = ('columns', 'data')
+
+    def __init__(self, columns: Iterable[str], data: Iterable[Iterable[Any]]):
+        self.columns = tuple(columns)
+        self.data = tuple(tuple(values) for values in data)
+
+    @classmethod
+    def from_cursor(cls, cursor: sqlite3.Cursor, chunk_size: int = EXPORT_CHUNK_SIZE) -> 'RowBatch':
+        """Read every remaining row of ``cursor``, transposing it chunk by chunk"""
+        columns = [description[0] for description in cursor.description]
+        data = [[] for _ in columns]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for values, chunk in zip(data, zip(*rows)):
+                values.extend(chunk)
+        return cls(columns, data)
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def __iter__(self) -> Iterator[tuple]:
+        return map(_record_type(self.columns)._make, zip(*self.data))
+
+    def column(self, name: str) -> tuple:
+        """All values of one column"""
+        return self.data[self.columns.index(name)]
+
+    def to_dicts(self) -> List[Dict]:
+        """The rows as dicts, as execute_query returns them"""
+        return [dict(zip(self.columns, row)) for row in zip(*self.data)]
+
+    def to_arrow(self):
+        """
+        The batch as a pyarrow Table. Columns whose values SQLite stored with
+        mixed types are converted to strings.
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for values in self.data:
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays.append(pa.array([None if value is None else str(value) for value in values]))
+        return pa.Table.from_arrays(arrays, names=list(self.columns))
+
+    def to_pandas(self):
+        """
+        The batch as a DataFrame backed by Arrow memory (ArrowDtype columns).
+        Building the Arrow table is the only copy; pandas wraps its buffers.
+        """
+        import pandas as pd
+
+        return self.to_arrow().to_pandas(types_mapper=pd.ArrowDtype)
+
+
+# Containers longer than this are sized from an evenly spaced sample
+SIZE_SAMPLE = 64
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory footprint of a query result in bytes. Long lists and
+    tuples are extrapolated from SIZE_SAMPLE of their items, so sizing cost
+    does not grow with the row count.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, RowBatch):
+        size += estimate_size(value.columns) + estimate_size(value.data)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)) and len(value) > SIZE_SAMPLE:
+        step = len(value) / SIZE_SAMPLE
+        sample = [value[int(i * step)] for i in range(SIZE_SAMPLE)]
+        size += int(sum(estimate_size(item) for item in sample) * len(value) / SIZE_SAMPLE)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+def size_lower_bound(value: Any) -> int:
+    """A floor on estimate_size that costs nothing to compute: one pointer per value"""
+    if isinstance(value, RowBatch):
+        return len(value) * len(value.columns) * 8
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (tuple, dict)):
+        size += len(value) * len(value[0]) * 8
+    return size
+
+
+class QueryCache:
+    """
+    Process-wide LRU cache of query results with a TTL and a memory budget.
+
+    Entries record the tables they were read from; ``invalidate`` drops every
+    entry that depends on a written table. Each table also carries a version
+    so a read that overlapped a write is never stored.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, max_bytes: int = int(DEFAULT_CACHE_MB * 1024 * 1024),
+                 max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'skipped_stale': 0,
+            'skipped_oversize': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0 and self.max_entries > 0
+
+    def versions(self, tables: frozenset) -> tuple:
+        """Snapshot of the write versions of ``tables``, taken before a read"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def get(self, key: Any) -> tuple:
+        """Return ``(True, value)`` on a fresh hit, else ``(False, None)``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics['misses'] += 1
+                return False, None
+            value, tables, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self._metrics['expirations'] += 1
+                self._metrics['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            return True, value
+
+    def put(self, key: Any, value: Any, tables: frozenset, versions: tuple):
+        """Store a result unless a write to its tables happened since ``versions``"""
+        # Results that can't fit are skipped before paying for estimate_size
+        if size_lower_bound(value) > self.max_bytes:
+            with self._lock:
+                self._metrics['skipped_oversize'] += 1
+            return
+        size = estimate_size(value)
+        with self._lock:
+            if tuple(self._versions.get(table, 0) for table in sorted(tables)) != versions:
+                self._metrics['skipped_stale'] += 1
+                return
+            if size > self.max_bytes:
+                self._metrics['skipped_oversize'] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tables, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            self._metrics['stores'] += 1
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._drop(next(iter(self._entries)))
+                self._metrics['evictions'] += 1
+
+    def invalidate(self, tables: set):
+        """Drop every entry that read from any of ``tables``"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                self._drop(key)
+            self._metrics['invalidations'] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Any):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_PARAM_LIST = re.compile(r'\(\?(?:, \?)+\)')
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_project_files: Dict[str, bool] = {}
+
+
+def query_fingerprint(query: str) -> str:
+    """Normalize a statement so calls differing only in literals group together"""
+    text = _SQL_LITERAL.sub('?', ' '.join(query.split()))
+    return _SQL_PARAM_LIST.sub('(?, ...)', text)
+
+
+def _query_origin() -> tuple:
+    """
+    ``(method, caller)`` for the statement being run: the outermost
+    DatabaseManager method on the stack and the outermost project script,
+    which is the page under Streamlit.
+    """
+    method = caller = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        in_project = _project_files.get(filename)
+        if in_project is None:
+            in_project = _project_files[filename] = os.path.abspath(filename).startswith(_PROJECT_DIR)
+        if in_project:
+            if frame.f_globals.get('__name__') == __name__:
+                if hasattr(DatabaseManager, frame.f_code.co_name):
+                    method = frame.f_code.co_name
+            else:
+                caller = os.path.relpath(os.path.abspath(filename), _PROJECT_DIR)
+        frame = frame.f_back
+    return method, caller
+
+
+class QuerySample:
+    """Timing of one statement, updated as its rows are fetched"""
+    __slots__ = ('query', 'params', 'method', 'caller', 'elapsed', 'rows', 'bytes', 'logged')
+
+    def __init__(self, query: str, params: Any, method: Optional[str], caller: Optional[str]):
+        self.query = query
+        self.params = params
+        self.method = method
+        self.caller = caller
+        self.elapsed = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.logged = False
+
+
+class QueryLog:
+    """
+    Opt-in per-statement timing. Keeps the most recent samples of each query
+    fingerprint for percentile summaries and appends statements slower than
+    ``slow_ms`` to a JSON-lines log together with their query plan.
+    """
+
+    def __init__(self, enabled: bool = QUERY_TIMING, slow_ms: float = SLOW_QUERY_MS,
+                 log_path: Optional[str] = SLOW_QUERY_LOG, max_samples: int = 1000,
+                 max_fingerprints: int = 500):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.max_samples = max_samples
+        self.max_fingerprints = max_fingerprints
+        self._queries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._slow: deque = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def start(self, query: str, params: Any) -> QuerySample:
+        """Register a statement about to run and return its sample"""
+        sample = QuerySample(query, params, *_query_origin())
+        fingerprint = query_fingerprint(query)
+        with self._lock:
+            entry = self._queries.get(fingerprint)
+            if entry is None:
+                entry = self._queries[fingerprint] = {
+                    'calls': 0, 'samples': deque(maxlen=self.max_samples),
+                    'methods': set(), 'callers': set(),
+                }
+                while len(self._queries) > self.max_fingerprints:
+                    self._queries.popitem(last=False)
+            else:
+                self._queries.move_to_end(fingerprint)
+            entry['calls'] += 1
+            entry['samples'].append(sample)
+            entry['methods'].add(sample.method)
+            entry['callers'].add(sample.caller)
+        return sample
+
+    def update(self, sample: QuerySample, elapsed: float, rows: int = 0, size: int = 0,
+               conn: Optional[sqlite3.Connection] = None):
+        """Add time and rows to a sample, logging it the first time it turns slow"""
+        sample.elapsed += elapsed
+        sample.rows += rows
+        sample.bytes += size
+        if sample.logged or sample.elapsed * 1000 < self.slow_ms:
+            return
+        sample.logged = True
+        entry = {
+            'at': now_timestamp(),
+            'ms': round(sample.elapsed * 1000, 1),
+            'method': sample.method,
+            'caller': sample.caller,
+            'rows': sample.rows,
+            'fingerprint': query_fingerprint(sample.query),
+            'params': repr(sample.params)[:200],
+            'plan': self._explain(conn, sample) if conn is not None else [],
+        }
+        with self._lock:
+            self._slow.append(entry)
+            if self.log_path:
+                Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as handle:
+                    handle.write(json.dumps(entry, default=str) + '\n')
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sample: QuerySample) -> List[str]:
+        if not sample.query.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sample.query}", sample.params or ())
+            return [row[-1] for row in rows.fetchall()]
+        except sqlite3.Error as exc:
+            return [f"EXPLAIN failed: {exc}"]
+
+    def summary(self, by: str = 'fingerprint') -> List[Dict[str, Any]]:
+        """
+        Latency percentiles over the retained samples, grouped by query
+        fingerprint, 'method' or 'caller', slowest total first
+        """
+        groups: Dict[Any, List[QuerySample]] = {}
+        with self._lock:
+            for fingerprint, entry in self._queries.items():
+                for sample in entry['samples']:
+                    key = fingerprint if by == 'fingerprint' else getattr(sample, by)
+                    groups.setdefault(key, []).append(sample)
+        summary = []
+        for key, samples in groups.items():
+            times = sorted(sample.elapsed * 1000 for sample in samples)
+
+            def percentile(fraction):
+                return times[max(0, math.ceil(fraction * len(times)) - 1)]
+            summary.append({
+                by: key,
+                'calls': len(samples),
+                'total_ms': round(sum(times), 1),
+                'p50_ms': round(percentile(0.50), 2),
+                'p95_ms': round(percentile(0.95), 2),
+                'p99_ms': round(percentile(0.99), 2),
+                'max_ms': round(times[-1], 2),
+                'avg_rows': round(sum(sample.rows for sample in samples) / len(samples), 1),
+                'avg_bytes': int(sum(sample.bytes for sample in samples) / len(samples)),
+                'methods': sorted({sample.method or '' for sample in samples}),
+                'callers': sorted({sample.caller or '' for sample in samples}),
+            })
+        summary.sort(key=lambda row: row['total_ms'], reverse=True)
+        return summary
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Most recent slow statements, newest first"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._slow.clear()
+
+
+def _row_size(row: Any) -> int:
+    return estimate_size(tuple(row) if isinstance(row, sqlite3.Row) else row)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports execute and fetch time to its connection's QueryLog"""
+
+    _sample: Optional[QuerySample] = None
+
+    def _timed(self, method: Callable, *args) -> Any:
+        started = time.perf_counter()
+        result = method(*args)
+        return result, time.perf_counter() - started
+
+    def execute(self, sql: str, parameters: Any = ()):
+        log = self.connection.query_log
+        self._sample = log.start(sql, parameters)
+        _, elapsed = self._timed(super().execute, sql, parameters)
+        rows = max(self.rowcount, 0) if self.description is None else 0
+        log.update(self._sample, elapsed, rows, conn=self.connection)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable):
+        log = self.connection.query_log
+        self._sample = log.start(sql, None)
+        _, elapsed = self._timed(super().executemany, sql, seq_of_parameters)
+        log.update(self._sample, elapsed, max(self.rowcount, 0))
+        return self
+
+    def _fetched(self, rows: List[Any], elapsed: float):
+        if self._sample is not None:
+            self.connection.query_log.update(
+                self._sample, elapsed, len(rows), sum(_row_size(row) for row in rows), self.connection
+            )
+
+    def fetchone(self):
+        row, elapsed = self._timed(super().fetchone)
+        self._fetched([] if row is None else [row], elapsed)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        rows, elapsed = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._fetched(rows, elapsed)
+        return rows
+
+    def fetchall(self):
+        rows, elapsed = self._timed(super().fetchall)
+        self._fetched(rows, elapsed)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched([], time.perf_counter() - started)
+            raise
+        self._fetched([row], time.perf_counter() - started)
+        return row
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection handing out TimedCursors while its QueryLog is enabled"""
+
+    query_log: Optional[QueryLog] = None
+
+    def cursor(self, factory: Optional[type] = None):
+        if factory is None:
+            factory = TimedCursor if self.query_log is not None and self.query_log.enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections.
+
+    Each thread keeps the connection it leased for as long as it holds it, so
+    nested ``connection()`` blocks reuse the same handle and transaction. When
+    released, a connection goes back to the idle list and the same thread gets
+    it again on its next checkout if it is still free.
+    """
+
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_POOL_TIMEOUT, health_check_interval: float = 60.0,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 on_release: Optional[Callable[[], None]] = None,
+                 factory: type = sqlite3.Connection):
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+        self.on_release = on_release
+        self.factory = factory
+
+        self._lock = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._last_used: Dict[int, float] = {}
+        self._all: List[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._closed = False
+
+        self._metrics = {
+            'checkouts': 0,
+            'reused': 0,
+            'created': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection usable from any thread holding the lease"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               factory=self.factory)
+        if self.on_connect:
+            self.on_connect(conn)
+        self._metrics['created'] += 1
+        self._all.append(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Drop a connection from the pool and close it"""
+        if conn in self._all:
+            self._all.remove(conn)
+        self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Ping connections that have been idle for longer than the check interval"""
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            self._metrics['health_check_failures'] += 1
+            return False
+
+    def _acquire(self) -> sqlite3.Connection:
+        preferred = getattr(self._local, 'last_conn', None)
+        started = time.monotonic()
+        waited = False
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+
+                conn = None
+                if preferred is not None and preferred in self._idle:
+                    conn = preferred
+                    self._idle.remove(conn)
+                elif self._idle:
+                    conn = self._idle.pop()
+
+                if conn is not None:
+                    if not self._is_healthy(conn):
+                        self._discard(conn)
+                        continue
+                    self._metrics['reused'] += 1
+                    break
+
+                if len(self._all) < self.size:
+                    conn = self._connect()
+                    break
+
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise sqlite3.OperationalError(
+                        f"Timed out after {self.timeout:.1f}s waiting for a database connection"
+                    )
+                waited = True
+                self._lock.wait(remaining)
+
+            self._metrics['checkouts'] += 1
+            if waited:
+                wait_time = time.monotonic() - started
+                self._metrics['waits'] += 1
+                self._metrics['wait_time_total'] += wait_time
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._closed or conn not in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                return
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.append(conn)
+            self._lock.notify()
+
+    @contextmanager
+    def detached(self) -> Iterator[sqlite3.Connection]:
+        """
+        Lease a connection outside the current thread's ``connection()``
+        block, for readers that stay open while the thread does other work
+        (e.g. a streaming cursor). Writes made by the thread meanwhile go
+        through their own lease and commit as usual; the detached connection
+        does not see them until its read finishes, and never commits.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def holds_connection(self) -> bool:
+        """Whether the current thread is inside a ``connection()`` block"""
+        return getattr(self._local, 'conn', None) is not None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Lease a connection for the current thread.
+
+        Behaves like ``with sqlite3.connect(...)``: the outermost block commits
+        on success and rolls back on error. Nested blocks in the same thread
+        share the outer connection and transaction.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._local.last_conn = conn
+            self._release(conn)
+            if self.on_release:
+                self.on_release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy and wait metrics"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({
+                'size': self.size,
+                'open': len(self._all),
+                'idle': len(self._idle),
+                'in_use': len(self._all) - len(self._idle),
+            })
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+        stats['wait_ratio'] = stats['waits'] / checkouts if checkouts else 0.0
+        return stats
+
+    def close_all(self):
+        """Close every pooled connection; leased ones are closed on release"""
+        with self._lock:
+            self._closed = True
+            for conn in list(self._idle):
+                self._discard(conn)
+            self._idle.clear()
+            self._lock.notify_all()
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "nctracker.db"):
+    def __init__(self, db_path: str = "nctracker.db", pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_timeout: float = DEFAULT_POOL_TIMEOUT,
+                 storage_profile: Union[str, Dict[str, Any], None] = None,
+                 cache: Optional[QueryCache] = None, query_log: Optional[QueryLog] = None):
         self.db_path = db_path
+        self.storage_profile = resolve_storage_profile(storage_profile)
+        self.busy_retries = 0
+        self.fts_enabled = False
+        self.cache = cache if cache is not None else QueryCache()
+        self.query_log = query_log if query_log is not None else QueryLog()
+        self._pending_writes = threading.local()
+        self.pool = ConnectionPool(db_path, size=pool_size, timeout=pool_timeout,
+                                   on_connect=self._configure_connection,
+                                   on_release=self._flush_invalidations,
+                                   factory=TimedConnection)
         self.init_database()
+        self.report_storage_profile()
     
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Apply the per-connection PRAGMAs of the storage profile"""
+        profile = self.storage_profile
+        conn.query_log = self.query_log
+        conn.execute(f"PRAGMA busy_timeout = {profile['busy_timeout_ms']}")
+        conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+        conn.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+        conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    
+    def get_storage_profile(self) -> Dict[str, Any]:
+        """Read back the PRAGMAs actually in effect on a pooled connection"""
+        synchronous_names = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+        temp_store_names = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+        with self.pool.connection() as conn:
+            def pragma(name):
+                return conn.execute(f"PRAGMA {name}").fetchone()[0]
+            return {
+                'name': self.storage_profile['name'],
+                'journal_mode': str(pragma('journal_mode')).upper(),
+                'synchronous': synchronous_names.get(pragma('synchronous')),
+                'cache_size': pragma('cache_size'),
+                'mmap_size': pragma('mmap_size'),
+                'temp_store': temp_store_names.get(pragma('temp_store')),
+                'busy_timeout_ms': pragma('busy_timeout'),
+                'busy_retries': self.storage_profile['busy_retries'],
+                'busy_backoff_ms': self.storage_profile['busy_backoff_ms'],
+            }
+    
+    def report_storage_profile(self):
+        """Print the active storage profile"""
+        active = self.get_storage_profile()
+        settings = ', '.join(f"{key}={value}" for key, value in active.items() if key != 'name')
+        print(f"Database storage profile '{active['name']}' ({self.db_path}): {settings}")
+    
+    @retry_on_busy
     def init_database(self):
-        """Initialize database and create tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username VARCHAR(50) UNIQUE NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    full_name VARCHAR(100) NOT NULL,
-                    role VARCHAR(20) NOT NULL,
-                    department VARCHAR(50),
-                    password_hash VARCHAR(128) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP
-                )
-            ''')
-            
-            # NCRs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ncrs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ncr_number VARCHAR(20) UNIQUE NOT NULL,
-                    title VARCHAR(200) NOT NULL,
-                    status VARCHAR(20) DEFAULT 'NEW',
-                    priority INTEGER DEFAULT 3,
-                    
-                    -- Section 1: NCR Details
-                    site VARCHAR(50),
-                    part_number VARCHAR(50),
-                    part_number_rev VARCHAR(20),
-                    quantity_affected INTEGER,
-                    units_affected TEXT,
-                    project_affected VARCHAR(100),
-                    serial_number VARCHAR(50),
-                    other_id VARCHAR(50),
-                    po_number VARCHAR(50),
-                    supplier VARCHAR(100),
-                    build_group_operation VARCHAR(100),
-                    
-                    -- Problem Statement
-                    problem_is TEXT,
-                    problem_should_be TEXT,
-                    
-                    -- Containment
-                    is_contained BOOLEAN,
-                    how_contained TEXT,
-                    containment_justification TEXT,
-                    
-                    -- Section 2: NC Level and CAPA
-                    nc_level INTEGER,
-                    capa_required BOOLEAN,
-                    capa_number VARCHAR(50),
-                    qe_assigned BOOLEAN,
-                    nc_owner_assigned BOOLEAN,
-                    external_notification_required BOOLEAN,
-                    external_notification_method TEXT,
-                    
-                    -- Section 3: Investigation
-                    problem_category VARCHAR(50),
-                    disposition_action VARCHAR(50),
-                    disposition_instructions TEXT,
-                    disposition_justification TEXT,
-                    required_approvals TEXT,
-                    
-                    -- Section 4: Correction
-                    correction_actions TEXT,
-                    evidence_of_completion TEXT,
-                    tags TEXT,
-                    
-                    -- Section 5: Closure
-                    closure_date DATE,
-                    qe_audit_complete BOOLEAN,
-                    
-                    -- Metadata
-                    created_by INTEGER NOT NULL,
-                    assigned_to INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    closed_at TIMESTAMP,
-                    
-                    FOREIGN KEY (created_by) REFERENCES users (id),
-                    FOREIGN KEY (assigned_to) REFERENCES users (id)
+        """
+        Bring the database up to SCHEMA_VERSION. When it is already current
+        this costs a couple of PRAGMA reads and no DDL.
+        """
+        with self.pool.connection() as conn:
+            # Journal mode is stored in the database file, so set it once here
+            conn.execute(f"PRAGMA journal_mode = {self.storage_profile['journal_mode']}")
+        
+        self.migrate()
+        self._resume_interrupted_bulk_load()
+        
+        # Create default admin user if none exists
+        self.create_default_admin()
+    
+    def schema_version(self) -> int:
+        """The migration version recorded in the database file"""
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    @retry_on_busy
+    def migrate(self, target: int = SCHEMA_VERSION) -> List[int]:
+        """
+        Apply the SCHEMA_MIGRATIONS above the database's user_version, up to
+        ``target``, and return the versions applied. Each migration runs in
+        its own BEGIN IMMEDIATE transaction that also records its version,
+        so concurrent starters apply it once; batched backfills commit in
+        between chunks (see _backfill_in_chunks).
+        """
+        applied = []
+        with self.pool.connection() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                return applied
+            for version, description, method in SCHEMA_MIGRATIONS:
+                if version > target:
+                    break
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.commit()
+                    continue
+                started = time.perf_counter()
+                getattr(self, method)(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                applied.append(version)
+                print(f"Applied schema migration {version} ({description}) "
+                      f"in {time.perf_counter() - started:.2f}s")
+        return applied
+    
+    def _backfill_in_chunks(self, conn: sqlite3.Connection, table: str, assignments: str,
+                            condition: str, chunk_size: int = MIGRATION_CHUNK_SIZE) -> int:
+        """
+        ``UPDATE table SET assignments WHERE condition`` one rowid range at a
+        time, committing after each range so other writers only ever wait
+        for one chunk. Runs inside a migration's transaction and leaves a
+        new one open. Returns the number of rows updated.
+        """
+        last_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+        updated = 0
+        for first in range(1, last_rowid + 1, chunk_size):
+            cursor = conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE rowid BETWEEN ? AND ? AND ({condition})",
+                (first, first + chunk_size - 1)
+            )
+            updated += cursor.rowcount
+            conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+        return updated
+    
+    def _resume_interrupted_bulk_load(self):
+        """
+        Rebuild derived tables whose insert trigger is missing, which
+        happens when a deferred bulk load was interrupted
+        """
+        with self.pool.connection() as conn:
+            present = {
+                row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
                 )
-            ''')
+            }
+        self.fts_enabled = 'ncrs_fts' in present
+        missing = [
+            trigger for trigger in BULK_LOAD_TRIGGERS
+            if trigger not in present and (self.fts_enabled or trigger != 'ncrs_fts_ai')
+        ]
+        if missing:
+            self._resume_bulk_maintenance()
+    
+    # Schema migrations (see SCHEMA_MIGRATIONS)
+    def _migrate_base_tables(self, conn: sqlite3.Connection):
+        """Users, NCRs and the tables hanging off them"""
+        # Users table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(50) UNIQUE NOT NULL,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                full_name VARCHAR(100) NOT NULL,
+                role VARCHAR(20) NOT NULL,
+                department VARCHAR(50),
+                password_hash VARCHAR(128) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_login TIMESTAMP
+            )
+        ''')
+        
+        # NCRs table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ncrs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ncr_number VARCHAR(20) UNIQUE NOT NULL,
+                title VARCHAR(200) NOT NULL,
+                status VARCHAR(20) DEFAULT 'NEW',
+                priority INTEGER DEFAULT 3,
+                
+                -- Section 1: NCR Details
+                site VARCHAR(50),
+                part_number VARCHAR(50),
+                part_number_rev VARCHAR(20),
+                quantity_affected INTEGER,
+                units_affected TEXT,
+                project_affected VARCHAR(100),
+                serial_number VARCHAR(50),
+                other_id VARCHAR(50),
+                po_number VARCHAR(50),
+                supplier VARCHAR(100),
+                build_group_operation VARCHAR(100),
+                
+                -- Problem Statement
+                problem_is TEXT,
+                problem_should_be TEXT,
+                
+                -- Containment
+                is_contained BOOLEAN,
+                how_contained TEXT,
+                containment_justification TEXT,
+                
+                -- Section 2: NC Level and CAPA
+                nc_level INTEGER,
+                capa_required BOOLEAN,
+                capa_number VARCHAR(50),
+                qe_assigned BOOLEAN,
+                nc_owner_assigned BOOLEAN,
+                external_notification_required BOOLEAN,
+                external_notification_method TEXT,
+                
+                -- Section 3: Investigation
+                problem_category VARCHAR(50),
+                disposition_action VARCHAR(50),
+                disposition_instructions TEXT,
+                disposition_justification TEXT,
+                required_approvals TEXT,
+                
+                -- Section 4: Correction
+                correction_actions TEXT,
+                evidence_of_completion TEXT,
+                tags TEXT,
+                
+                -- Section 5: Closure
+                closure_date DATE,
+                qe_audit_complete BOOLEAN,
+                
+                -- Metadata
+                created_by INTEGER NOT NULL,
+                assigned_to INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                closed_at TIMESTAMP,
+                
+                FOREIGN KEY (created_by) REFERENCES users (id),
+                FOREIGN KEY (assigned_to) REFERENCES users (id)
+            )
+        ''')
 
-            # Ensure tags column exists for legacy databases
-            cursor.execute("PRAGMA table_info(ncrs)")
-            existing_columns = [row[1] for row in cursor.fetchall()]
-            if 'tags' not in existing_columns:
-                cursor.execute("ALTER TABLE ncrs ADD COLUMN tags TEXT")
-            
-            # Comments table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS comments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ncr_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        # Comments table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS comments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ncr_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Attachments table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS attachments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ncr_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                filename VARCHAR(255) NOT NULL,
+                file_path VARCHAR(500) NOT NULL,
+                file_size INTEGER,
+                mime_type VARCHAR(100),
+                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Status history table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS status_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ncr_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                old_status VARCHAR(20),
+                new_status VARCHAR(20),
+                change_reason TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Mentions table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS mentions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                comment_id INTEGER NOT NULL,
+                mentioned_user_id INTEGER NOT NULL,
+                notified BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (comment_id) REFERENCES comments (id) ON DELETE CASCADE,
+                FOREIGN KEY (mentioned_user_id) REFERENCES users (id) ON DELETE CASCADE
+            )
+        ''')
+    
+    def _migrate_tags_column(self, conn: sqlite3.Connection):
+        """Add ncrs.tags to databases created before tagging"""
+        existing_columns = [row[1] for row in conn.execute("PRAGMA table_info(ncrs)")]
+        if 'tags' not in existing_columns:
+            conn.execute("ALTER TABLE ncrs ADD COLUMN tags TEXT")
+    
+    def _migrate_ncr_tags(self, conn: sqlite3.Connection):
+        """Normalized tags, kept in sync with ncrs.tags by triggers"""
+        backfill_tags = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ncr_tags'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ncr_tags (
+                ncr_id INTEGER NOT NULL,
+                tag VARCHAR(100) NOT NULL,
+                PRIMARY KEY (ncr_id, tag),
+                FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''')
+        self.ensure_tag_sync(conn, backfill=backfill_tags)
+    
+    def _migrate_ncr_sequences(self, conn: sqlite3.Connection):
+        self.ensure_ncr_sequences(conn)
+    
+    def _migrate_canonical_timestamps(self, conn: sqlite3.Connection):
+        """
+        Rewrite stored timestamps into canonical form in batches, then add
+        triggers that canonicalize values later written by CURRENT_TIMESTAMP
+        defaults or external scripts, so no startup pass is needed
+        """
+        rewritten = 0
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            for column in columns:
+                rewritten += self._backfill_in_chunks(
+                    conn, table, f"{column} = {_canonical_timestamp_sql(column)}",
+                    _stale_timestamp_sql(column)
                 )
+            self.ensure_timestamp_triggers(conn, table)
+        if rewritten:
+            self._note_write(set(TIMESTAMP_COLUMNS) | DERIVED_TABLES['ncrs'])
+    
+    def _migrate_indexes(self, conn: sqlite3.Connection):
+        self.ensure_indexes(conn)
+    
+    def _migrate_search_index(self, conn: sqlite3.Connection):
+        self.ensure_search_index(conn)
+    
+    def _migrate_dashboard_stats(self, conn: sqlite3.Connection):
+        self.ensure_dashboard_stats(conn)
+    
+    def _migrate_analytics_rollups(self, conn: sqlite3.Connection):
+        self.ensure_analytics_rollups(conn)
+    
+    def ensure_indexes(self, conn: sqlite3.Connection) -> List[str]:
+        """Create any missing managed indexes and return the names created"""
+        existing = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        created = []
+        for name, table, columns in MANAGED_INDEXES:
+            if name not in existing:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+                created.append(name)
+        return created
+    
+    def _trigger_exists(self, conn: sqlite3.Connection, name: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone() is not None
+    
+    def ensure_tag_sync(self, conn: sqlite3.Connection, backfill: bool = False):
+        """
+        Create the triggers that mirror ncrs.tags into ncr_tags. With
+        ``backfill``, or when the insert trigger was missing, the table is
+        first populated from the JSON column.
+        """
+        backfill = backfill or not self._trigger_exists(conn, 'ncr_tags_ai')
+        new_tags = TAG_VALUES_SQL.format(ref='new', source='')
+        triggers = [
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncr_tags_ai AFTER INSERT ON ncrs BEGIN
+                INSERT OR IGNORE INTO ncr_tags (ncr_id, tag) {new_tags};
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncr_tags_au AFTER UPDATE OF tags ON ncrs BEGIN
+                DELETE FROM ncr_tags WHERE ncr_id = old.id;
+                INSERT OR IGNORE INTO ncr_tags (ncr_id, tag) {new_tags};
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS ncr_tags_ad AFTER DELETE ON ncrs BEGIN
+                DELETE FROM ncr_tags WHERE ncr_id = old.id;
+            END
+            ''',
+        ]
+        for trigger in triggers:
+            conn.execute(trigger)
+        
+        if backfill:
+            conn.execute("DELETE FROM ncr_tags")
+            backfill_tags = TAG_VALUES_SQL.format(ref='n', source='ncrs n, ')
+            conn.execute(f"INSERT OR IGNORE INTO ncr_tags (ncr_id, tag) {backfill_tags}")
+    
+    def ensure_timestamp_triggers(self, conn: sqlite3.Connection, table: str):
+        """Canonicalize the TIMESTAMP_COLUMNS of ``table`` whenever a row is written"""
+        columns = TIMESTAMP_COLUMNS[table]
+        stale = ' OR '.join(_stale_timestamp_sql(f'new.{column}') for column in columns)
+        assignments = ', '.join(f"{column} = {_canonical_timestamp_sql(column)}" for column in columns)
+        fix = f"UPDATE {table} SET {assignments} WHERE rowid = new.rowid;"
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_timestamps_ai AFTER INSERT ON {table}
+            WHEN {stale} BEGIN {fix} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_timestamps_au AFTER UPDATE OF {', '.join(columns)} ON {table}
+            WHEN {stale} BEGIN {fix} END
+        ''')
+    
+    def ensure_ncr_sequences(self, conn: sqlite3.Connection):
+        """Create the per-scope counters behind NCR numbering"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ncr_sequences (
+                scope VARCHAR(50) PRIMARY KEY,
+                last_value INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+    
+    def ensure_dashboard_stats(self, conn: sqlite3.Connection):
+        """
+        Create the ncr_stats table and the triggers that keep it current,
+        computing it from scratch the first time it is created or when its
+        insert trigger is missing after a deferred bulk load.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ncr_stats'"
+        ).fetchone() and self._trigger_exists(conn, 'ncr_stats_ai')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ncr_stats (
+                metric VARCHAR(20) NOT NULL,
+                key VARCHAR(50) NOT NULL,
+                value REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (metric, key)
+            ) WITHOUT ROWID
+        ''')
+        
+        add_new = '\n'.join(_stats_delta_statements('new', 1))
+        remove_old = '\n'.join(_stats_delta_statements('old', -1))
+        triggers = [
+            f"CREATE TRIGGER IF NOT EXISTS ncr_stats_ai AFTER INSERT ON ncrs BEGIN {add_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS ncr_stats_ad AFTER DELETE ON ncrs BEGIN {remove_old} END",
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncr_stats_au
+            AFTER UPDATE OF status, nc_level, created_at, closed_at ON ncrs BEGIN
+                {remove_old}
+                {add_new}
+            END
+            ''',
+        ]
+        for trigger in triggers:
+            conn.execute(trigger)
+        
+        if not exists:
+            self.rebuild_dashboard_stats()
+    
+    @retry_on_busy
+    def rebuild_dashboard_stats(self):
+        """Recompute ncr_stats from the ncrs table in one transaction"""
+        with self.pool.connection() as conn:
+            self._note_write({'ncr_stats'})
+            conn.execute("DELETE FROM ncr_stats")
+            conn.execute('''
+                INSERT INTO ncr_stats (metric, key, value)
+                SELECT 'total', '', COUNT(*) FROM ncrs
+                UNION ALL
+                SELECT 'status', COALESCE(status, ''), COUNT(*) FROM ncrs GROUP BY COALESCE(status, '')
+                UNION ALL
+                SELECT 'nc_level', CAST(nc_level AS TEXT), COUNT(*) FROM ncrs
+                WHERE nc_level IS NOT NULL GROUP BY CAST(nc_level AS TEXT)
+                UNION ALL
+                SELECT 'created_day', substr(created_at, 1, 10), COUNT(*) FROM ncrs
+                WHERE created_at IS NOT NULL GROUP BY substr(created_at, 1, 10)
+                UNION ALL
+                SELECT 'resolution', 'count', COUNT(*) FROM ncrs
+                WHERE status = 'CLOSED' AND closed_at IS NOT NULL
+                UNION ALL
+                SELECT 'resolution', 'days_sum', COALESCE(SUM(julianday(closed_at) - julianday(created_at)), 0)
+                FROM ncrs WHERE status = 'CLOSED' AND closed_at IS NOT NULL
             ''')
-            
-            # Attachments table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS attachments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ncr_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    filename VARCHAR(255) NOT NULL,
-                    file_path VARCHAR(500) NOT NULL,
-                    file_size INTEGER,
-                    mime_type VARCHAR(100),
-                    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-                )
+    
+    def verify_dashboard_stats(self) -> Dict[str, tuple]:
+        """
+        Compare the materialized statistics against a full recompute.
+        Returns ``{stat: (materialized, recomputed)}`` for every mismatch.
+        """
+        with self.pool.connection():
+            materialized = self.get_dashboard_stats()
+            recomputed = self.compute_dashboard_stats()
+        drift = {}
+        for key, expected in recomputed.items():
+            actual = materialized.get(key)
+            if key == 'avg_resolution_days':
+                mismatch = abs((actual or 0) - (expected or 0)) > 0.05
+            else:
+                mismatch = actual != expected
+            if mismatch:
+                drift[key] = (actual, expected)
+        return drift
+
+    def ensure_analytics_rollups(self, conn: sqlite3.Connection):
+        """
+        Create the daily/monthly rollup tables and the triggers that keep
+        them current, computing them from scratch the first time they are
+        created or when the insert trigger is missing after a bulk load.
+        """
+        exists = all(
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            for table in ROLLUP_TABLES.values()
+        ) and self._trigger_exists(conn, 'ncr_rollups_ai')
+        dimensions = ',\n'.join(
+            f"{dimension} {'INTEGER' if dimension in ROLLUP_UNSET else 'TEXT'} NOT NULL"
+            for dimension in ROLLUP_DIMENSIONS
+        )
+        measures = ',\n'.join(
+            f"{measure} {'REAL' if measure.endswith('_sum') else 'INTEGER'} NOT NULL DEFAULT 0"
+            for measure in ROLLUP_MEASURES
+        )
+        for table in ROLLUP_TABLES.values():
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket VARCHAR(10) NOT NULL,
+                    {dimensions},
+                    {measures},
+                    PRIMARY KEY (bucket, {', '.join(ROLLUP_DIMENSIONS)})
+                ) WITHOUT ROWID
             ''')
-            
-            # Status history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS status_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ncr_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    old_status VARCHAR(20),
-                    new_status VARCHAR(20),
-                    change_reason TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (ncr_id) REFERENCES ncrs (id) ON DELETE CASCADE,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    
+        add_new = '\n'.join(_rollup_delta_statements('new', 1))
+        remove_old = '\n'.join(_rollup_delta_statements('old', -1))
+        triggers = [
+            f"CREATE TRIGGER IF NOT EXISTS ncr_rollups_ai AFTER INSERT ON ncrs BEGIN {add_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS ncr_rollups_ad AFTER DELETE ON ncrs BEGIN {remove_old} END",
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncr_rollups_au
+            AFTER UPDATE OF {', '.join(ROLLUP_SOURCE_COLUMNS)} ON ncrs BEGIN
+                {remove_old}
+                {add_new}
+            END
+            ''',
+        ]
+        for trigger in triggers:
+            conn.execute(trigger)
+    
+        if not exists:
+            self.rebuild_analytics_rollups()
+    
+    @retry_on_busy
+    def rebuild_analytics_rollups(self):
+        """Recompute the rollup tables from the ncrs table in one transaction"""
+        columns = ', '.join(['bucket', *ROLLUP_DIMENSIONS, *ROLLUP_MEASURES])
+        with self.pool.connection() as conn:
+            self._note_write(set(ROLLUP_TABLES.values()))
+            for grain, table in ROLLUP_TABLES.items():
+                conn.execute(f"DELETE FROM {table}")
+                conn.execute(f"INSERT INTO {table} ({columns}) {_rollup_source_query(grain)}")
+    
+    def verify_analytics_rollups(self) -> Dict[str, int]:
+        """
+        Compare each rollup table against a full recompute. Returns
+        ``{table: mismatched_rows}`` for every table that has drifted.
+        """
+        columns = ', '.join(
+            f"ROUND({column}, 6)" if column in ROLLUP_MEASURES else column
+            for column in ['bucket', *ROLLUP_DIMENSIONS, *ROLLUP_MEASURES]
+        )
+        drift = {}
+        with self.pool.connection() as conn:
+            for grain, table in ROLLUP_TABLES.items():
+                stored = f"SELECT {columns} FROM {table}"
+                recomputed = f"SELECT {columns} FROM ({_rollup_source_query(grain)})"
+                mismatched = conn.execute(f'''
+                    SELECT (SELECT COUNT(*) FROM ({stored} EXCEPT {recomputed}))
+                         + (SELECT COUNT(*) FROM ({recomputed} EXCEPT {stored}))
+                ''').fetchone()[0]
+                if mismatched:
+                    drift[table] = mismatched
+        return drift
+    
+    def ensure_search_index(self, conn: sqlite3.Connection) -> bool:
+        """
+        Create the ncrs_fts table and its sync triggers, populating it on
+        first creation or after a deferred bulk load. Returns False when
+        SQLite was built without FTS5, in which case search falls back to
+        LIKE matching.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ncrs_fts'"
+        ).fetchone() and self._trigger_exists(conn, 'ncrs_fts_ai')
+        try:
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS ncrs_fts USING fts5(
+                    {', '.join(SEARCH_COLUMNS)},
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
                 )
             ''')
-            
-            # Mentions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mentions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    comment_id INTEGER NOT NULL,
-                    mentioned_user_id INTEGER NOT NULL,
-                    notified BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (comment_id) REFERENCES comments (id) ON DELETE CASCADE,
-                    FOREIGN KEY (mentioned_user_id) REFERENCES users (id) ON DELETE CASCADE
-                )
+        except sqlite3.OperationalError as exc:
+            if 'fts5' not in str(exc).lower():
+                raise
+            self.fts_enabled = False
+            return False
+        self.fts_enabled = True
+        
+        columns = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(
+            SEARCH_COMMENTS_SQL.format(ref='new.id') if column == 'comments' else f'new.{column}'
+            for column in SEARCH_COLUMNS
+        )
+        old_comments = SEARCH_COMMENTS_SQL.format(ref='old.ncr_id')
+        new_comments = SEARCH_COMMENTS_SQL.format(ref='new.ncr_id')
+        triggers = [
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncrs_fts_ai AFTER INSERT ON ncrs BEGIN
+                INSERT INTO ncrs_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS ncrs_fts_au
+            AFTER UPDATE OF {', '.join(SEARCH_INDEXED_FIELDS)} ON ncrs BEGIN
+                DELETE FROM ncrs_fts WHERE rowid = old.id;
+                INSERT INTO ncrs_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS ncrs_fts_ad AFTER DELETE ON ncrs BEGIN
+                DELETE FROM ncrs_fts WHERE rowid = old.id;
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN
+                UPDATE ncrs_fts SET comments = {new_comments} WHERE rowid = new.ncr_id;
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF content, ncr_id ON comments BEGIN
+                UPDATE ncrs_fts SET comments = {old_comments} WHERE rowid = old.ncr_id;
+                UPDATE ncrs_fts SET comments = {new_comments} WHERE rowid = new.ncr_id;
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN
+                UPDATE ncrs_fts SET comments = {old_comments} WHERE rowid = old.ncr_id;
+            END
+            ''',
+        ]
+        for trigger in triggers:
+            conn.execute(trigger)
+        
+        if not exists:
+            self.rebuild_search_index()
+        return True
+    
+    @retry_on_busy
+    def rebuild_search_index(self):
+        """Repopulate ncrs_fts from the ncrs and comments tables"""
+        if not self.fts_enabled:
+            return
+        with self.pool.connection() as conn:
+            source_values = ', '.join(
+                SEARCH_COMMENTS_SQL.format(ref='n.id') if column == 'comments' else f'n.{column}'
+                for column in SEARCH_COLUMNS
+            )
+            self._note_write({'ncrs_fts'})
+            conn.execute("DELETE FROM ncrs_fts")
+            conn.execute(f'''
+                INSERT INTO ncrs_fts (rowid, {', '.join(SEARCH_COLUMNS)})
+                SELECT n.id, {source_values} FROM ncrs n
             ''')
-            
-            conn.commit()
-            
-        # Create default admin user if none exists
-        self.create_default_admin()
     
+    def _hot_queries(self) -> List[tuple]:
+        """Queries issued on every page load, as (name, sql, params)"""
+        hot = [
+            ('ncr_list', *self._build_ncr_query()),
+            ('ncr_list_by_status', *self._build_ncr_query({'status': 'NEW'})),
+            ('ncr_list_by_level', *self._build_ncr_query({'nc_level': 1})),
+            ('ncr_list_by_creator', *self._build_ncr_query({'created_by': 1})),
+            ('comments_by_ncr', COMMENTS_QUERY, (1,)),
+            ('attachments_by_ncr', ATTACHMENTS_QUERY, (1,)),
+            ('status_history_by_ncr', STATUS_HISTORY_QUERY, (1,)),
+            ('mentions_by_ncr', MENTIONS_QUERY, (1,)),
+        ]
+        hot.append(('dashboard_stats', MATERIALIZED_STATS_QUERY, ()))
+        hot.append(('dashboard_recent_ncrs', RECENT_NCRS_QUERY, ()))
+        hot.append(('dashboard_prior_recent_ncrs', PRIOR_RECENT_NCRS_QUERY, ()))
+        hot.append(('dashboard_critical_open', CRITICAL_OPEN_NCRS_QUERY, ()))
+        hot.append(('dashboard_recent_list', *self._recent_ncrs_query(15)))
+        hot.append(('analytics_monthly_trend', *self._rollup_query(['month'], '2024-01-01', '2024-12-31')))
+        hot.append(('analytics_daily_trend', *self._rollup_query(['day'], '2024-06-01', '2024-06-30')))
+        hot.append(('ncr_ids_by_tag', "SELECT ncr_id FROM ncr_tags WHERE tag = ?", ('audit',)))
+        return hot
+    
+    @retry_on_busy
+    def explain_query_plans(self) -> Dict[str, List[str]]:
+        """Return the EXPLAIN QUERY PLAN detail lines for every hot query"""
+        plans = {}
+        with self.pool.connection() as conn:
+            for name, query, params in self._hot_queries():
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+                plans[name] = [row[-1] for row in rows]
+        return plans
+    
+    def verify_query_plans(self) -> Dict[str, List[str]]:
+        """
+        Check that no hot query falls back to a full table scan or sorts
+        through a temporary b-tree. Raises QueryPlanError listing offenders.
+        """
+        plans = self.explain_query_plans()
+        problems = []
+        for name, details in plans.items():
+            for detail in details:
+                full_scan = detail.startswith('SCAN ') and ' USING ' not in detail
+                if full_scan or 'USE TEMP B-TREE' in detail:
+                    problems.append(f"{name}: {detail}")
+        if problems:
+            raise QueryPlanError("Hot queries without index support:\n  " + "\n  ".join(problems))
+        return plans
+    
+    @retry_on_busy
     def create_default_admin(self):
         """Create default admin user if no users exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM users")
             user_count = cursor.fetchone()[0]
@@ -192,23 +2180,117 @@ class DatabaseManager:
                 print("Default admin user created: username='admin', password='admin123'")
     
     def get_connection(self):
-        """Get database connection"""
+        """Get a standalone database connection owned (and closed) by the caller"""
         return sqlite3.connect(self.db_path)
     
+    def _note_write(self, tables: set):
+        """Record tables written in the current transaction for invalidation"""
+        pending = getattr(self._pending_writes, 'tables', None)
+        if pending is None:
+            pending = self._pending_writes.tables = set()
+        pending.update(tables)
+    
+    def _has_pending_writes(self) -> bool:
+        return bool(getattr(self._pending_writes, 'tables', None))
+    
+    def _flush_invalidations(self):
+        """Invalidate cached reads once the writing transaction has ended"""
+        pending = getattr(self._pending_writes, 'tables', None)
+        if pending:
+            self._pending_writes.tables = set()
+            self.cache.invalidate(pending)
+    
+    def _cached(self, key: Any, tables: frozenset, loader: Callable[[], Any]) -> Any:
+        """
+        Serve ``loader()`` from the query cache. Reads inside a transaction
+        that has uncommitted writes bypass the cache entirely.
+        """
+        if not self.cache.enabled or self._has_pending_writes():
+            return loader()
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        versions = self.cache.versions(tables)
+        value = loader()
+        self.cache.put(key, value, tables, versions)
+        return value
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Query cache hit/miss counters and occupancy"""
+        return self.cache.stats()
+    
+    def clear_cache(self):
+        """Drop every cached query result"""
+        self.cache.clear()
+    
+    def data_version(self, tables: Iterable[str] = CACHEABLE_TABLES) -> tuple:
+        """
+        Token that changes whenever a committed write touches one of
+        ``tables``, for keying caches that live outside the query cache
+        """
+        return self.cache.versions(frozenset(tables))
+    
+    def set_query_timing(self, enabled: bool, slow_ms: Optional[float] = None):
+        """Turn per-statement timing on or off, optionally changing the slow threshold"""
+        self.query_log.enabled = enabled
+        if slow_ms is not None:
+            self.query_log.slow_ms = slow_ms
+    
+    def get_query_timings(self, by: str = 'fingerprint') -> List[Dict[str, Any]]:
+        """p50/p95/p99 latency per query fingerprint, 'method' or 'caller'"""
+        return self.query_log.summary(by)
+    
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """Recent statements over the slow-query threshold, with their plans"""
+        return self.query_log.slow_queries()
+    
+    def reset_query_timings(self):
+        self.query_log.reset()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool occupancy and wait metrics"""
+        stats = self.pool.stats()
+        stats['busy_retries'] = self.busy_retries
+        return stats
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close_all()
+    
+    @retry_on_busy
     def execute_query(self, query: str, params: tuple = ()) -> List[Dict]:
-        """Execute a query and return results as list of dictionaries"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+        """
+        Execute a query and return results as list of dictionaries.
+        Results are served from the query cache until a write touches one of
+        the tables the query reads.
+        """
+        def run():
+            with self.pool.connection() as conn:
+                cursor = conn.execute(query, params)
+                return tuple(description[0] for description in cursor.description or ()), cursor.fetchall()
+        
+        columns, rows = self._cached(('query', query, tuple(params)), tables_read_by(query), run)
+        # The cache holds immutable tuples; each call builds its own dicts once
+        return [dict(zip(columns, row)) for row in rows]
     
+    def query_batch(self, query: str, params: tuple = ()) -> RowBatch:
+        """
+        Execute a query and return a RowBatch. Cached like execute_query, but
+        the cached batch is returned as is since it cannot be modified.
+        """
+        def run():
+            with self.pool.connection() as conn:
+                return RowBatch.from_cursor(conn.execute(query, params))
+        
+        return self._cached(('batch', query, tuple(params)), tables_read_by(query), run)
+    
+    @retry_on_busy
     def execute_update(self, query: str, params: tuple = ()) -> int:
         """Execute an update/insert query and return last row id"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
-            conn.commit()
+            self._note_write(tables_written_by(query))
             return cursor.lastrowid
     
     # User Management
@@ -243,12 +2325,9 @@ class DatabaseManager:
         return self.execute_query(query)
     
     # NCR Management
+    @retry_on_busy
     def create_ncr(self, ncr_data: Dict) -> int:
         """Create a new NCR"""
-        # Generate NCR number
-        ncr_number = self.generate_ncr_number()
-        ncr_data['ncr_number'] = ncr_number
-        
         query = '''
             INSERT INTO ncrs (
                 ncr_number, title, status, priority, site, part_number, part_number_rev,
@@ -258,106 +2337,359 @@ class DatabaseManager:
                 capa_number, qe_assigned, nc_owner_assigned, external_notification_required,
                 external_notification_method, problem_category, disposition_action,
                 disposition_instructions, disposition_justification, required_approvals,
-                correction_actions, evidence_of_completion, tags, created_by
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                correction_actions, evidence_of_completion, tags, created_by, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
         
-        params = (
-            ncr_data.get('ncr_number'),
-            ncr_data.get('title'),
-            ncr_data.get('status', 'NEW'),
-            ncr_data.get('priority', 3),
-            ncr_data.get('site'),
-            ncr_data.get('part_number'),
-            ncr_data.get('part_number_rev'),
-            ncr_data.get('quantity_affected'),
-            ncr_data.get('units_affected'),
-            ncr_data.get('project_affected'),
-            ncr_data.get('serial_number'),
-            ncr_data.get('other_id'),
-            ncr_data.get('po_number'),
-            ncr_data.get('supplier'),
-            ncr_data.get('build_group_operation'),
-            ncr_data.get('problem_is'),
-            ncr_data.get('problem_should_be'),
-            ncr_data.get('is_contained'),
-            ncr_data.get('how_contained'),
-            ncr_data.get('containment_justification'),
-            ncr_data.get('nc_level'),
-            ncr_data.get('capa_required'),
-            ncr_data.get('capa_number'),
-            ncr_data.get('qe_assigned'),
-            ncr_data.get('nc_owner_assigned'),
-            ncr_data.get('external_notification_required'),
-            ncr_data.get('external_notification_method'),
-            ncr_data.get('problem_category'),
-            ncr_data.get('disposition_action'),
-            ncr_data.get('disposition_instructions'),
-            ncr_data.get('disposition_justification'),
-            json.dumps(ncr_data.get('required_approvals', [])),
-            json.dumps(ncr_data.get('correction_actions', [])),
-            ncr_data.get('evidence_of_completion'),
-            json.dumps(ncr_data.get('tags', [])),
-            ncr_data.get('created_by')
-        )
+        # Number allocation and insert share one transaction
+        with self.pool.connection():
+            ncr_data['ncr_number'] = self.generate_ncr_number(ncr_data.get('site'))
+            now = now_timestamp()
+            
+            params = (
+                ncr_data.get('ncr_number'),
+                ncr_data.get('title'),
+                ncr_data.get('status', 'NEW'),
+                ncr_data.get('priority', 3),
+                ncr_data.get('site'),
+                ncr_data.get('part_number'),
+                ncr_data.get('part_number_rev'),
+                ncr_data.get('quantity_affected'),
+                ncr_data.get('units_affected'),
+                ncr_data.get('project_affected'),
+                ncr_data.get('serial_number'),
+                ncr_data.get('other_id'),
+                ncr_data.get('po_number'),
+                ncr_data.get('supplier'),
+                ncr_data.get('build_group_operation'),
+                ncr_data.get('problem_is'),
+                ncr_data.get('problem_should_be'),
+                ncr_data.get('is_contained'),
+                ncr_data.get('how_contained'),
+                ncr_data.get('containment_justification'),
+                ncr_data.get('nc_level'),
+                ncr_data.get('capa_required'),
+                ncr_data.get('capa_number'),
+                ncr_data.get('qe_assigned'),
+                ncr_data.get('nc_owner_assigned'),
+                ncr_data.get('external_notification_required'),
+                ncr_data.get('external_notification_method'),
+                ncr_data.get('problem_category'),
+                ncr_data.get('disposition_action'),
+                ncr_data.get('disposition_instructions'),
+                ncr_data.get('disposition_justification'),
+                json.dumps(ncr_data.get('required_approvals', [])),
+                json.dumps(ncr_data.get('correction_actions', [])),
+                ncr_data.get('evidence_of_completion'),
+                json.dumps(ncr_data.get('tags', [])),
+                ncr_data.get('created_by'),
+                now,
+                now
+            )
         
-        return self.execute_update(query, params)
+            return self.execute_update(query, params)
+    
+    def _import_params(self, record: Dict) -> tuple:
+        """Validate one bulk record and map it onto NCR_IMPORT_COLUMNS"""
+        unknown = set(record) - set(NCR_IMPORT_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown column(s): {', '.join(sorted(unknown))}")
+        if not record.get('title'):
+            raise ValueError("title is required")
+        if record.get('created_by') in (None, ''):
+            raise ValueError("created_by is required")
+        params = []
+        for column in NCR_IMPORT_COLUMNS:
+            value = record.get(column)
+            if column in NCR_JSON_COLUMNS:
+                if value is None:
+                    value = []
+                if not isinstance(value, (list, tuple)):
+                    raise ValueError(f"{column} must be a list")
+                value = json.dumps(list(value))
+            elif column in TIMESTAMP_COLUMNS['ncrs']:
+                value = canonical_timestamp(value)
+            params.append(value)
+        return tuple(params)
+    
+    @retry_on_busy
+    def _suspend_bulk_maintenance(self):
+        """Drop ncrs insert triggers and secondary indexes ahead of a bulk load"""
+        with self.pool.connection() as conn:
+            for trigger in BULK_LOAD_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            for name, table, columns in MANAGED_INDEXES:
+                if table in BULK_LOAD_INDEXED_TABLES:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+    
+    @retry_on_busy
+    def _resume_bulk_maintenance(self):
+        """Recreate what _suspend_bulk_maintenance dropped and rebuild derived tables"""
+        with self.pool.connection() as conn:
+            self._note_write({'ncrs'} | DERIVED_TABLES['ncrs'])
+            self.ensure_indexes(conn)
+            self.ensure_tag_sync(conn)
+            self.ensure_search_index(conn)
+            self.ensure_dashboard_stats(conn)
+            self.ensure_analytics_rollups(conn)
+    
+    @retry_on_busy
+    def _insert_chunk(self, chunk: List[tuple]) -> tuple:
+        """
+        Insert one chunk of ``(row_index, record)`` pairs in a single
+        transaction and return ``(created, errors)``. Counters are first
+        moved past any explicit ``ncr_number`` values, then numbers are
+        reserved per site/year scope for the rest; when executemany hits a
+        constraint the chunk is replayed row by row so only the offending
+        rows are reported.
+        """
+        errors = []
+        with self.pool.connection() as conn:
+            pending = []
+            by_scope = {}
+            used = {}
+            for index, record in chunk:
+                try:
+                    params = self._import_params(record)
+                except (ValueError, TypeError) as exc:
+                    errors.append({'row': index, 'error': str(exc), 'record': record})
+                    continue
+                pending.append((index, record, params))
+                created_at = str(record.get('created_at') or '')
+                key = (record.get('site'), int(created_at[:4]) if created_at[:4].isdigit() else None)
+                if not record.get('ncr_number'):
+                    by_scope.setdefault(key, []).append(len(pending) - 1)
+                    continue
+                value = ncr_number_sequence(record['ncr_number'], *key)
+                if value is not None and value > used.get(key, 0):
+                    used[key] = value
+            
+            self._advance_ncr_sequences(conn, used)
+            for (site, year), positions in by_scope.items():
+                numbers = self.allocate_ncr_numbers(len(positions), site, year)
+                for position, number in zip(positions, numbers):
+                    index, record, params = pending[position]
+                    pending[position] = (index, record, (number,) + params[1:])
+            
+            self._note_write({'ncrs'} | DERIVED_TABLES['ncrs'])
+            conn.execute("SAVEPOINT bulk_chunk")
+            try:
+                conn.executemany(NCR_BULK_INSERT_QUERY, [params for _, _, params in pending])
+                created = len(pending)
+            except sqlite3.IntegrityError:
+                conn.execute("ROLLBACK TO bulk_chunk")
+                created = 0
+                for index, record, params in pending:
+                    try:
+                        conn.execute(NCR_BULK_INSERT_QUERY, params)
+                        created += 1
+                    except sqlite3.IntegrityError as exc:
+                        errors.append({'row': index, 'error': str(exc), 'record': record})
+            conn.execute("RELEASE bulk_chunk")
+        return created, errors
+    
+    def bulk_create_ncrs(self, records: Iterable[Dict], chunk_size: int = BULK_CHUNK_SIZE,
+                         defer_maintenance: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Insert many NCRs with executemany, committing every ``chunk_size``
+        rows. Records use NCR_IMPORT_COLUMNS keys; a record without an
+        ``ncr_number`` gets one from its site/year sequence.
+        
+        With ``defer_maintenance`` the tag, search and statistics triggers
+        and the secondary ncrs indexes are dropped for the load and rebuilt
+        once at the end. By default that happens once the load reaches
+        BULK_DEFER_THRESHOLD rows, so small imports keep the triggers live. If the load is interrupted,
+        the next startup finds the triggers missing and rebuilds them.
+        
+        Returns ``{'created', 'failed', 'errors', 'elapsed'}`` where each
+        error is ``{'row', 'error', 'record'}`` with a 0-based row index.
+        """
+        if defer_maintenance is None and hasattr(records, '__len__'):
+            defer_maintenance = len(records) >= BULK_DEFER_THRESHOLD
+        
+        started = time.perf_counter()
+        created = 0
+        errors: List[Dict] = []
+        suspended = False
+        try:
+            chunk = []
+            for index, record in enumerate(records):
+                chunk.append((index, record))
+                if not suspended and (defer_maintenance or
+                                      (defer_maintenance is None and index + 1 >= BULK_DEFER_THRESHOLD)):
+                    self._suspend_bulk_maintenance()
+                    suspended = True
+                if len(chunk) >= chunk_size:
+                    chunk_created, chunk_errors = self._insert_chunk(chunk)
+                    created += chunk_created
+                    errors.extend(chunk_errors)
+                    chunk = []
+            if chunk:
+                chunk_created, chunk_errors = self._insert_chunk(chunk)
+                created += chunk_created
+                errors.extend(chunk_errors)
+        finally:
+            if suspended:
+                self._resume_bulk_maintenance()
+        
+        return {
+            'created': created,
+            'failed': len(errors),
+            'errors': errors,
+            'elapsed': time.perf_counter() - started,
+        }
     
     def get_ncr_by_id(self, ncr_id: int) -> Optional[Dict]:
         """Get NCR by ID"""
-        query = '''
-            SELECT n.*, u1.full_name as created_by_name, u2.full_name as assigned_to_name
-            FROM ncrs n
-            LEFT JOIN users u1 ON n.created_by = u1.id
-            LEFT JOIN users u2 ON n.assigned_to = u2.id
-            WHERE n.id = ?
-        '''
-        results = self.execute_query(query, (ncr_id,))
+        results = self.execute_query(NCR_BY_ID_QUERY, (ncr_id,))
         if results:
-            ncr = results[0]
-            # Parse JSON fields
-            ncr['required_approvals'] = json.loads(ncr.get('required_approvals', '[]'))
-            ncr['correction_actions'] = json.loads(ncr.get('correction_actions', '[]'))
-            ncr['tags'] = json.loads(ncr.get('tags', '[]')) if ncr.get('tags') else []
-            return ncr
+            return self._parse_ncr_fields(results[0])
         return None
     
-    def get_ncrs(self, filters: Dict = None) -> List[Dict]:
-        """Get all NCRs with optional filters"""
-        query = '''
-            SELECT n.*, u1.full_name as created_by_name, u2.full_name as assigned_to_name
-            FROM ncrs n
-            LEFT JOIN users u1 ON n.created_by = u1.id
-            LEFT JOIN users u2 ON n.assigned_to = u2.id
-        '''
+    @staticmethod
+    def _parse_ncr_fields(ncr: Dict) -> Dict:
+        """Decode the JSON-encoded columns of an NCR row in place"""
+        ncr['required_approvals'] = json.loads(ncr.get('required_approvals', '[]'))
+        ncr['correction_actions'] = json.loads(ncr.get('correction_actions', '[]'))
+        ncr['tags'] = json.loads(ncr.get('tags', '[]')) if ncr.get('tags') else []
+        return ncr
+    
+    @retry_on_busy
+    def get_ncr_bundle(self, ncr_id: int) -> Optional[Dict]:
+        """
+        Everything the detail page shows for one NCR, read in a single
+        transaction so all parts come from the same snapshot:
+        ``{'ncr', 'comments', 'attachments', 'status_history', 'mentions'}``.
+        Bundles are cached per ``updated_at`` and dropped when any of
+        NCR_BUNDLE_TABLES is written. Returns None if the NCR does not exist.
+        """
+        with self.pool.connection() as conn:
+            if not conn.in_transaction:
+                # sqlite3 only opens transactions implicitly for writes
+                conn.execute("BEGIN")
+            row = conn.execute("SELECT updated_at FROM ncrs WHERE id = ?", (ncr_id,)).fetchone()
+            if row is None:
+                return None
+            
+            def load():
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                
+                def fetch(query):
+                    return [dict(r) for r in cursor.execute(query, (ncr_id,)).fetchall()]
+                
+                return {
+                    'ncr': self._parse_ncr_fields(fetch(NCR_BY_ID_QUERY)[0]),
+                    'comments': fetch(COMMENTS_QUERY),
+                    'attachments': fetch(ATTACHMENTS_QUERY),
+                    'status_history': fetch(STATUS_HISTORY_QUERY),
+                    'mentions': fetch(MENTIONS_QUERY),
+                }
+            
+            bundle = self._cached(('ncr_bundle', ncr_id, row[0]), NCR_BUNDLE_TABLES, load)
+        # The NCR holds lists parsed from JSON, so callers get a private copy
+        return copy.deepcopy(bundle)
+    
+    def _build_ncr_conditions(self, filters: Dict = None) -> tuple:
+        """
+        Build WHERE conditions and parameters for an NCR filter spec.
         
+        Supported keys:
+            status, nc_level, created_by, assigned_to, site, supplier,
+            problem_category, disposition_action: a value, or a list of values
+                to match any of
+            tags: list of tags the NCR must all carry (subset match)
+            tags_any: list of tags the NCR must carry at least one of
+            created_from / created_to: inclusive ``created_at`` bounds
+            search: free text, matched through the full-text index
+        """
         where_conditions = []
         params = []
         
-        if filters:
-            if filters.get('status'):
-                where_conditions.append('n.status = ?')
-                params.append(filters['status'])
-            
-            if filters.get('nc_level'):
-                where_conditions.append('n.nc_level = ?')
-                params.append(filters['nc_level'])
-            
-            if filters.get('created_by'):
-                where_conditions.append('n.created_by = ?')
-                params.append(filters['created_by'])
-            
-            if filters.get('search'):
+        if not filters:
+            return where_conditions, params
+        
+        for field in NCR_FILTER_FIELDS:
+            value = filters.get(field)
+            if value is None or value == '' or value == []:
+                continue
+            condition, values = in_condition(f"n.{field}", value)
+            where_conditions.append(condition)
+            params.extend(values)
+        
+        required_tags = list(dict.fromkeys(filters.get('tags') or []))
+        if required_tags:
+            where_conditions.append(f'''n.id IN (
+                SELECT ncr_id FROM ncr_tags
+                WHERE tag IN ({', '.join('?' for _ in required_tags)})
+                GROUP BY ncr_id HAVING COUNT(*) = ?
+            )''')
+            params.extend(required_tags + [len(required_tags)])
+        
+        any_tags = list(filters.get('tags_any') or [])
+        if any_tags:
+            where_conditions.append(
+                f"n.id IN (SELECT ncr_id FROM ncr_tags WHERE tag IN ({', '.join('?' for _ in any_tags)}))"
+            )
+            params.extend(any_tags)
+        
+        if filters.get('created_from'):
+            where_conditions.append('n.created_at >= ?')
+            params.append(str(filters['created_from']))
+        if filters.get('created_to'):
+            where_conditions.append('n.created_at <= ?')
+            params.append(str(filters['created_to']))
+        
+        if filters.get('search'):
+            match_query = build_match_query(filters['search'])
+            if self.fts_enabled and match_query:
+                where_conditions.append('n.id IN (SELECT rowid FROM ncrs_fts WHERE ncrs_fts MATCH ?)')
+                params.append(match_query)
+            else:
                 where_conditions.append('(n.title LIKE ? OR n.part_number LIKE ? OR n.problem_is LIKE ?)')
                 search_term = f"%{filters['search']}%"
                 params.extend([search_term, search_term, search_term])
         
+        return where_conditions, params
+    
+    def _build_ncr_query(self, filters: Dict = None, sort: Union[str, List[tuple]] = 'newest',
+                         limit: int = None, offset: int = 0, select: str = None) -> tuple:
+        """Build the NCR list query and its parameters"""
+        select = select or NCR_FULL_SELECT
+        query = f'''
+            SELECT {select}
+            FROM ncrs n
+            LEFT JOIN users u1 ON n.created_by = u1.id
+            LEFT JOIN users u2 ON n.assigned_to = u2.id
+        '''
+        
+        if sort == 'relevance':
+            sort = 'newest'
+        _, keys = resolve_sort(sort)
+        if any(expr == NCR_SORT_FIELDS['score'] for expr, _ in keys):
+            raise ValueError("Sorting by score requires a search; use get_ncr_page or search_ncrs")
+        
+        where_conditions, params = self._build_ncr_conditions(filters)
         if where_conditions:
             query += ' WHERE ' + ' AND '.join(where_conditions)
         
-        query += ' ORDER BY n.created_at DESC'
+        query += ' ORDER BY ' + ', '.join(f"{expr} {'DESC' if desc else 'ASC'}" for expr, desc in keys)
         
-        results = self.execute_query(query, tuple(params))
+        if limit is not None:
+            query += ' LIMIT ? OFFSET ?'
+            params.extend([limit, offset])
+        
+        return query, tuple(params)
+    
+    def get_ncrs(self, filters: Dict = None, sort: Union[str, List[tuple]] = 'newest',
+                 limit: int = None, offset: int = 0, projection: str = 'full') -> List[Dict]:
+        """
+        Get NCRs matching a filter spec (see _build_ncr_conditions), ordered by
+        a sort spec (see resolve_sort), optionally limited to a slice, with
+        the columns of ``projection`` (see NCR_PROJECTIONS)
+        """
+        query, params = self._build_ncr_query(filters, sort, limit, offset, select=projection_select(projection))
+        results = self.execute_query(query, params)
         for ncr in results:
             if isinstance(ncr.get('tags'), str):
                 try:
@@ -366,6 +2698,229 @@ class DatabaseManager:
                     ncr['tags'] = []
         return results
     
+    def iter_ncrs(self, columns: List[str] = None, filters: Dict = None,
+                  sort: Union[str, List[tuple]] = 'newest',
+                  chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """
+        Stream NCRs as chunks of row tuples in ``columns`` order (keys of
+        NCR_EXPORT_COLUMNS, all of them by default). Rows come straight off
+        one cursor with fetchmany and bypass the query cache, so memory is
+        bounded by ``chunk_size`` however many rows match. See iter_query
+        for how the connection is held.
+        """
+        columns = list(columns or NCR_EXPORT_COLUMNS)
+        unknown = [column for column in columns if column not in NCR_EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown NCR column(s): {', '.join(unknown)}")
+        select = ', '.join(f"{NCR_EXPORT_COLUMNS[column]} AS {column}" for column in columns)
+        query, params = self._build_ncr_query(filters, sort, select=select)
+        return self.iter_query(query, params, chunk_size)
+    
+    def get_ncr_batch(self, columns: Union[str, List[str]] = 'summary', filters: Dict = None,
+                      sort: Union[str, List[tuple]] = 'newest', limit: int = None,
+                      offset: int = 0) -> RowBatch:
+        """
+        NCRs as a column-oriented RowBatch, for result sets too large for a
+        dict per row. ``columns`` is a projection name (see NCR_PROJECTIONS)
+        or a list of NCR_EXPORT_COLUMNS keys.
+        """
+        if isinstance(columns, str):
+            select = projection_select(columns)
+        else:
+            unknown = [column for column in columns if column not in NCR_EXPORT_COLUMNS]
+            if unknown:
+                raise ValueError(f"Unknown NCR column(s): {', '.join(unknown)}")
+            select = ', '.join(f"{NCR_EXPORT_COLUMNS[column]} AS {column}" for column in columns)
+        return self.query_batch(*self._build_ncr_query(filters, sort, limit, offset, select=select))
+    
+    def iter_query(self, query: str, params: tuple = (),
+                   chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """
+        Stream a query's rows in fetchmany chunks without caching them.
+        
+        The cursor runs on a detached pool connection held until the
+        generator is exhausted or closed, so writes on this thread while it
+        is suspended still commit on their own. It holds a pool slot meanwhile
+        and does not see writes the thread has not yet committed. Close the
+        generator (or use it in a ``for`` loop to the end) when done.
+        """
+        with self.pool.detached() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    
+    def _recent_ncrs_query(self, limit: int) -> tuple:
+        return self._build_ncr_query(sort='newest', limit=limit, select=projection_select('summary'))
+    
+    def get_recent_ncrs(self, limit: int = 15) -> RowBatch:
+        """Newest NCRs in the 'summary' projection, as a RowBatch for the Dashboard table"""
+        return self.query_batch(*self._recent_ncrs_query(limit))
+    
+    def get_all_tags(self) -> List[str]:
+        """Distinct tags used across NCRs, sorted case-insensitively"""
+        rows = self.execute_query("SELECT DISTINCT tag FROM ncr_tags ORDER BY lower(tag)")
+        return [row['tag'] for row in rows]
+    
+    def get_tag_counts(self, limit: int = None, prefix: str = None) -> List[Dict]:
+        """Tags with the number of NCRs using each, most used first"""
+        where, params = '', []
+        if prefix:
+            # Range scan on the tag index instead of LIKE, which can't use it
+            where = 'WHERE tag >= ? AND tag < ?'
+            params = [prefix, prefix + '\U0010ffff']
+        limit_sql = ''
+        if limit is not None:
+            limit_sql = 'LIMIT ?'
+            params.append(limit)
+        return self.execute_query(TAG_COUNTS_QUERY.format(where=where, limit=limit_sql), tuple(params))
+    
+    def get_tag_suggestions(self, limit: int = 12, prefix: str = None) -> List[str]:
+        """Most frequently used tags, optionally starting with ``prefix``"""
+        return [row['tag'] for row in self.get_tag_counts(limit=limit, prefix=prefix)]
+    
+    def count_ncrs(self, filters: Dict = None, cap: int = COUNT_ESTIMATE_CAP) -> tuple:
+        """
+        Count NCRs matching ``filters``, stopping at ``cap`` rows.
+        Returns ``(count, exact)``; ``exact`` is False when the cap was hit.
+        """
+        where_conditions, params = self._build_ncr_conditions(filters)
+        where_sql = ' WHERE ' + ' AND '.join(where_conditions) if where_conditions else ''
+        rows = self.execute_query(
+            f"SELECT COUNT(*) as total FROM (SELECT 1 FROM ncrs n{where_sql} LIMIT ?)",
+            tuple(params) + (cap + 1,)
+        )
+        total = rows[0]['total']
+        return min(total, cap), total <= cap
+    
+    def get_ncr_page(self, filters: Dict = None, sort: Union[str, List[tuple]] = 'newest',
+                     page_size: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                     with_total: bool = True, projection: str = 'full') -> Dict:
+        """
+        Fetch one page of NCRs using keyset pagination.
+        
+        ``filters`` and ``sort`` take the same specs as get_ncrs; 'relevance'
+        ranks by full-text score and needs ``filters['search']``. Pass the returned
+        ``next_cursor`` back to fetch the following page. ``total`` is exact up
+        to COUNT_ESTIMATE_CAP and flagged with ``total_is_exact`` beyond that.
+        Items carry the columns of ``projection`` (see NCR_PROJECTIONS).
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        filters = dict(filters or {})
+        search_text = filters.get('search')
+        
+        match_query = build_match_query(search_text or '')
+        ranked = self.fts_enabled and bool(match_query)
+        if sort == 'relevance' and not ranked:
+            sort = 'newest'
+        signature, keys = resolve_sort(sort)
+        if not ranked and any(expr == NCR_SORT_FIELDS['score'] for expr, _ in keys):
+            raise ValueError("Sorting by score requires a search term")
+        
+        select_sql = f'SELECT {projection_select(projection)}'
+        from_sql = ' FROM ncrs n'
+        params: List[Any] = []
+        if ranked:
+            # Join the match set once so rows carry their score and snippet
+            weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+            select_sql += ', s.score, s.snippet'
+            from_sql += f'''
+                JOIN (
+                    SELECT rowid, bm25(ncrs_fts, {weights}) AS score,
+                           snippet(ncrs_fts, -1, '**', '**', '…', 16) AS snippet
+                    FROM ncrs_fts WHERE ncrs_fts MATCH ?
+                ) s ON s.rowid = n.id
+            '''
+            params.append(match_query)
+            filters.pop('search')
+        from_sql += '''
+            LEFT JOIN users u1 ON n.created_by = u1.id
+            LEFT JOIN users u2 ON n.assigned_to = u2.id
+        '''
+        
+        where_conditions, filter_params = self._build_ncr_conditions(filters)
+        params.extend(filter_params)
+        if cursor:
+            keyset_sql, keyset_params = keyset_condition(keys, decode_cursor(cursor, signature, len(keys)))
+            where_conditions.append(keyset_sql)
+            params.extend(keyset_params)
+        
+        select_sql += ''.join(f', {expr} AS _sort_key_{i}' for i, (expr, _) in enumerate(keys))
+        query = select_sql + from_sql
+        if where_conditions:
+            query += ' WHERE ' + ' AND '.join(where_conditions)
+        query += ' ORDER BY ' + ', '.join(f"{expr} {'DESC' if desc else 'ASC'}" for expr, desc in keys)
+        query += ' LIMIT ?'
+        params.append(page_size + 1)
+        
+        rows = self.execute_query(query, tuple(params))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        
+        last_key = None
+        for ncr in rows:
+            last_key = [ncr.pop(f'_sort_key_{i}') for i in range(len(keys))]
+            if isinstance(ncr.get('tags'), str):
+                try:
+                    ncr['tags'] = json.loads(ncr['tags'])
+                except json.JSONDecodeError:
+                    ncr['tags'] = []
+        
+        page = {
+            'items': rows,
+            'sort': signature,
+            'next_cursor': encode_cursor(signature, last_key) if has_more else None,
+            'has_more': has_more,
+        }
+        if with_total:
+            page['total'], page['total_is_exact'] = self.count_ncrs(dict(filters, search=search_text))
+        return page
+    
+    def search_ncrs(self, query: str, limit: int = 20, offset: int = 0,
+                    highlight: tuple = ('**', '**')) -> List[Dict]:
+        """
+        Full-text search across NCR content, best matches first.
+        
+        Every word is prefix-matched. Each result carries a BM25 ``score``
+        (lower is better) and a ``snippet`` with matches wrapped in ``highlight``.
+        """
+        match_query = build_match_query(query or '')
+        if not match_query:
+            return []
+        
+        if not self.fts_enabled:
+            results = self.get_ncrs({'search': query})[offset:offset + limit]
+            for ncr in results:
+                ncr['score'] = 0.0
+                ncr['snippet'] = (ncr.get('problem_is') or ncr.get('title') or '')[:150]
+            return results
+        
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        sql = f'''
+            SELECT n.id, n.ncr_number, n.title, n.status, n.nc_level, n.part_number,
+                   n.part_number_rev, n.tags, n.created_at, n.created_by,
+                   u1.full_name as created_by_name,
+                   bm25(ncrs_fts, {weights}) as score,
+                   snippet(ncrs_fts, -1, ?, ?, '…', 16) as snippet
+            FROM ncrs_fts
+            JOIN ncrs n ON n.id = ncrs_fts.rowid
+            LEFT JOIN users u1 ON n.created_by = u1.id
+            WHERE ncrs_fts MATCH ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        '''
+        results = self.execute_query(sql, (highlight[0], highlight[1], match_query, limit, offset))
+        for ncr in results:
+            try:
+                ncr['tags'] = json.loads(ncr['tags']) if ncr.get('tags') else []
+            except json.JSONDecodeError:
+                ncr['tags'] = []
+        return results
+    
+    @retry_on_busy
     def update_ncr(self, ncr_id: int, update_data: Dict) -> bool:
         """Update NCR data"""
         # Remove fields that shouldn't be updated
@@ -382,7 +2937,10 @@ class DatabaseManager:
             update_data['tags'] = json.dumps(update_data['tags'])
         
         # Add updated_at timestamp
-        update_data['updated_at'] = datetime.now().isoformat()
+        update_data['updated_at'] = now_timestamp()
+        for column in TIMESTAMP_COLUMNS['ncrs']:
+            if column in update_data:
+                update_data[column] = canonical_timestamp(update_data[column])
         
         # Build update query
         set_clause = ', '.join([f"{key} = ?" for key in update_data.keys()])
@@ -390,96 +2948,200 @@ class DatabaseManager:
         
         params = list(update_data.values()) + [ncr_id]
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
-            conn.commit()
+            self._note_write(tables_written_by(query))
             return cursor.rowcount > 0
     
-    def generate_ncr_number(self) -> str:
+    @retry_on_busy
+    def allocate_ncr_numbers(self, count: int = 1, site: str = None, year: int = None) -> List[str]:
+        """
+        Reserve ``count`` consecutive NCR numbers for a site/year scope.
+
+        The counter is bumped before it is read, so the write lock is held
+        from the first statement and concurrent callers queue on it instead
+        of handing out the same value. If any reserved number is already
+        in use (a row written without the allocator), the counter is resynced
+        from the highest number issued in the scope and the block reserved
+        after it. Called inside an outer ``pool.connection()`` block the
+        reservation commits (or rolls back) with the caller's insert.
+        """
+        prefix, seq_spec, suffix = ncr_number_scope(site, year)
+        scope = f"{prefix}#{suffix}"
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE ncr_sequences SET last_value = last_value + ? WHERE scope = ?", (count, scope)
+            )
+            if cursor.rowcount == 0:
+                self._seed_ncr_sequence(conn, prefix, suffix)
+                conn.execute(
+                    "UPDATE ncr_sequences SET last_value = last_value + ? WHERE scope = ?", (count, scope)
+                )
+            self._note_write({'ncr_sequences'})
+            last = conn.execute(
+                "SELECT last_value FROM ncr_sequences WHERE scope = ?", (scope,)
+            ).fetchone()[0]
+            numbers = [f"{prefix}{format(value, seq_spec)}{suffix}" for value in range(last - count + 1, last + 1)]
+            taken = conn.execute(
+                "SELECT 1 FROM ncrs WHERE ncr_number IN (SELECT value FROM json_each(?)) LIMIT 1",
+                (json.dumps(numbers),)
+            ).fetchone()
+            if taken:
+                # A row was written without the allocator: resync the counter
+                # from the highest number issued and reserve after it instead
+                issued_sql, issued_params = _issued_sequence_sql(prefix, suffix)
+                conn.execute(
+                    f"UPDATE ncr_sequences SET last_value = ({issued_sql}) + ? WHERE scope = ?",
+                    issued_params + (count, scope)
+                )
+                last = conn.execute(
+                    "SELECT last_value FROM ncr_sequences WHERE scope = ?", (scope,)
+                ).fetchone()[0]
+                numbers = [f"{prefix}{format(value, seq_spec)}{suffix}" for value in range(last - count + 1, last + 1)]
+        return numbers
+    
+    def _seed_ncr_sequence(self, conn: sqlite3.Connection, prefix: str, suffix: str):
+        """First use of a scope: start the counter after any numbers already issued"""
+        issued_sql, issued_params = _issued_sequence_sql(prefix, suffix)
+        conn.execute(
+            f"INSERT OR IGNORE INTO ncr_sequences (scope, last_value) SELECT ?, ({issued_sql})",
+            (f"{prefix}#{suffix}",) + issued_params
+        )
+    
+    def _advance_ncr_sequences(self, conn: sqlite3.Connection, used: Dict[tuple, int]):
+        """
+        Move each ``(site, year)`` counter in ``used`` past the highest
+        number imported for it, so allocation never hands out a number
+        that was written explicitly.
+        """
+        for (site, year), value in used.items():
+            prefix, _, suffix = ncr_number_scope(site, year)
+            scope = f"{prefix}#{suffix}"
+            cursor = conn.execute(
+                "UPDATE ncr_sequences SET last_value = MAX(last_value, ?) WHERE scope = ?", (value, scope)
+            )
+            if cursor.rowcount == 0:
+                self._seed_ncr_sequence(conn, prefix, suffix)
+                conn.execute(
+                    "UPDATE ncr_sequences SET last_value = MAX(last_value, ?) WHERE scope = ?", (value, scope)
+                )
+        if used:
+            self._note_write({'ncr_sequences'})
+    
+    def generate_ncr_number(self, site: str = None, year: int = None) -> str:
         """Generate next NCR number"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM ncrs")
-            count = cursor.fetchone()[0]
-            return f"NCR-{count + 1:04d}"
+        return self.allocate_ncr_numbers(1, site, year)[0]
     
     # Comments
     def add_comment(self, ncr_id: int, user_id: int, content: str) -> int:
         """Add comment to NCR"""
         query = '''
-            INSERT INTO comments (ncr_id, user_id, content)
-            VALUES (?, ?, ?)
+            INSERT INTO comments (ncr_id, user_id, content, created_at)
+            VALUES (?, ?, ?, ?)
         '''
-        return self.execute_update(query, (ncr_id, user_id, content))
+        return self.execute_update(query, (ncr_id, user_id, content, now_timestamp()))
     
     def get_comments(self, ncr_id: int) -> List[Dict]:
         """Get comments for NCR"""
-        query = '''
-            SELECT c.*, u.full_name as user_name, u.username
-            FROM comments c
-            JOIN users u ON c.user_id = u.id
-            WHERE c.ncr_id = ?
-            ORDER BY c.created_at ASC
-        '''
-        return self.execute_query(query, (ncr_id,))
+        return self.execute_query(COMMENTS_QUERY, (ncr_id,))
     
     # Status History
     def add_status_history(self, ncr_id: int, user_id: int, old_status: str, new_status: str, reason: str = None):
         """Add status change to history"""
         query = '''
-            INSERT INTO status_history (ncr_id, user_id, old_status, new_status, change_reason)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO status_history (ncr_id, user_id, old_status, new_status, change_reason, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
         '''
-        self.execute_update(query, (ncr_id, user_id, old_status, new_status, reason))
+        self.execute_update(query, (ncr_id, user_id, old_status, new_status, reason, now_timestamp()))
     
     # Attachments
     def add_attachment(self, ncr_id: int, user_id: int, filename: str, file_path: str, file_size: int, mime_type: str):
         """Add file attachment"""
         query = '''
-            INSERT INTO attachments (ncr_id, user_id, filename, file_path, file_size, mime_type)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO attachments (ncr_id, user_id, filename, file_path, file_size, mime_type, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         '''
-        return self.execute_update(query, (ncr_id, user_id, filename, file_path, file_size, mime_type))
+        return self.execute_update(
+            query, (ncr_id, user_id, filename, file_path, file_size, mime_type, now_timestamp())
+        )
     
     def get_attachments(self, ncr_id: int) -> List[Dict]:
         """Get attachments for NCR"""
-        query = '''
-            SELECT a.*, u.full_name as user_name
-            FROM attachments a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.ncr_id = ?
-            ORDER BY a.uploaded_at DESC
-        '''
-        return self.execute_query(query, (ncr_id,))
+        return self.execute_query(ATTACHMENTS_QUERY, (ncr_id,))
     
     # Analytics
     def get_dashboard_stats(self) -> Dict:
-        """Get dashboard statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        """Get dashboard statistics from the trigger-maintained ncr_stats table"""
+        stats = self._cached(('dashboard_stats',), frozenset({'ncr_stats', 'ncrs'}), self._read_dashboard_stats)
+        return copy.deepcopy(stats)
+    
+    @retry_on_busy
+    def _read_dashboard_stats(self) -> Dict:
+        with self.pool.connection() as conn:
+            rows = conn.execute(MATERIALIZED_STATS_QUERY).fetchall()
+            recent_ncrs = conn.execute(RECENT_NCRS_QUERY).fetchone()[0]
+            prior_recent_ncrs = conn.execute(PRIOR_RECENT_NCRS_QUERY).fetchone()[0]
+            critical_open_ncrs = conn.execute(CRITICAL_OPEN_NCRS_QUERY).fetchone()[0]
+        
+        values = {}
+        status_counts = {}
+        nc_level_counts = {}
+        for metric, key, value in rows:
+            if metric == 'status' and value > 0:
+                status_counts[key or None] = int(value)
+            elif metric == 'nc_level' and value > 0:
+                nc_level_counts[int(key) if key.lstrip('-').isdigit() else key] = int(value)
+            else:
+                values[(metric, key)] = value
+        
+        closed_count = values.get(('resolution', 'count'), 0)
+        avg_resolution = values.get(('resolution', 'days_sum'), 0) / closed_count if closed_count else 0
+        total_ncrs = int(values.get(('total', ''), 0))
+        
+        return {
+            'total_ncrs': total_ncrs,
+            'status_counts': status_counts,
+            'nc_level_counts': nc_level_counts,
+            'recent_ncrs': int(recent_ncrs),
+            'prior_recent_ncrs': int(prior_recent_ncrs),
+            'open_ncrs': total_ncrs - status_counts.get('CLOSED', 0),
+            'critical_open_ncrs': critical_open_ncrs,
+            'avg_resolution_days': round(avg_resolution, 1)
+        }
+    
+    @retry_on_busy
+    def compute_dashboard_stats(self) -> Dict:
+        """Recompute dashboard statistics with full aggregate queries"""
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             
             # Total NCRs
-            cursor.execute("SELECT COUNT(*) FROM ncrs")
+            cursor.execute(DASHBOARD_STATS_QUERIES['total_ncrs'])
             total_ncrs = cursor.fetchone()[0]
             
             # Status breakdown
-            cursor.execute("SELECT status, COUNT(*) FROM ncrs GROUP BY status")
+            cursor.execute(DASHBOARD_STATS_QUERIES['status_counts'])
             status_counts = dict(cursor.fetchall())
             
             # NC Level breakdown
-            cursor.execute("SELECT nc_level, COUNT(*) FROM ncrs WHERE nc_level IS NOT NULL GROUP BY nc_level")
+            cursor.execute(DASHBOARD_STATS_QUERIES['nc_level_counts'])
             nc_level_counts = dict(cursor.fetchall())
             
-            # Recent NCRs (last 30 days)
-            cursor.execute("SELECT COUNT(*) FROM ncrs WHERE created_at >= date('now', '-30 days')")
+            # Recent NCRs (last 30 days) and the 30 days before that
+            cursor.execute(DASHBOARD_STATS_QUERIES['recent_ncrs'])
             recent_ncrs = cursor.fetchone()[0]
+            cursor.execute(DASHBOARD_STATS_QUERIES['prior_recent_ncrs'])
+            prior_recent_ncrs = cursor.fetchone()[0]
+            
+            # Open and critical open NCRs
+            cursor.execute(DASHBOARD_STATS_QUERIES['open_ncrs'])
+            open_ncrs = cursor.fetchone()[0]
+            cursor.execute(DASHBOARD_STATS_QUERIES['critical_open_ncrs'])
+            critical_open_ncrs = cursor.fetchone()[0]
             
             # Average resolution time for closed NCRs
-            cursor.execute('''
-                SELECT AVG(julianday(closed_at) - julianday(created_at)) as avg_days
-                FROM ncrs WHERE status = 'CLOSED' AND closed_at IS NOT NULL
-            ''')
+            cursor.execute(DASHBOARD_STATS_QUERIES['avg_resolution_days'])
             avg_resolution = cursor.fetchone()[0] or 0
             
             return {
@@ -487,9 +3149,87 @@ class DatabaseManager:
                 'status_counts': status_counts,
                 'nc_level_counts': nc_level_counts,
                 'recent_ncrs': recent_ncrs,
+                'prior_recent_ncrs': prior_recent_ncrs,
+                'open_ncrs': open_ncrs,
+                'critical_open_ncrs': critical_open_ncrs,
                 'avg_resolution_days': round(avg_resolution, 1)
             }
 
+    
+    def _rollup_query(self, group_by: Iterable[str] = ('month',), start: Any = None, end: Any = None,
+                      filters: Optional[Dict[str, Any]] = None) -> tuple:
+        """Build the rollup query behind get_rollups, returning ``(query, params)``"""
+        group_by = list(group_by)
+        unknown = [key for key in group_by if key not in ROLLUP_PERIODS and key not in ROLLUP_DIMENSIONS]
+        unknown += [key for key in (filters or {}) if key not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown rollup dimension(s): {', '.join(unknown)}")
+        bounds = []
+        for bound in (start, end):
+            parsed = parse_timestamp(bound)
+            if bound is not None and parsed is None:
+                raise ValueError(f"Invalid rollup date: {bound!r}")
+            bounds.append(parsed.date() if parsed else None)
+        start, end = bounds
+        
+        # Whole months are answered from the monthly table, anything finer from the daily one
+        month_aligned = ((start is None or start.day == 1)
+                         and (end is None or (end + timedelta(days=1)).day == 1))
+        grain = 'month' if 'day' not in group_by and month_aligned else 'day'
+        
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("bucket >= ?")
+            params.append(start.isoformat()[:ROLLUP_PERIODS[grain]])
+        if end is not None:
+            conditions.append("bucket <= ?")
+            params.append(end.isoformat()[:ROLLUP_PERIODS[grain]])
+        for dimension, value in (filters or {}).items():
+            unset = ROLLUP_UNSET.get(dimension, '')
+            if isinstance(value, (list, tuple, set)):
+                value = [unset if item is None else item for item in value]
+            elif value is None:
+                value = unset
+            condition, values = in_condition(dimension, value)
+            conditions.append(condition)
+            params.extend(values)
+        
+        keys = []
+        for key in group_by:
+            if key not in ROLLUP_PERIODS:
+                keys.append(key)
+            elif ROLLUP_PERIODS[key] == ROLLUP_PERIODS[grain]:
+                keys.append(f"bucket AS {key}")
+            else:
+                keys.append(f"substr(bucket, 1, {ROLLUP_PERIODS[key]}) AS {key}")
+        sums = [f"COALESCE(SUM({measure}), 0) AS {measure}" for measure in ROLLUP_MEASURES]
+        query = f"SELECT {', '.join(keys + sums)} FROM {ROLLUP_TABLES[grain]}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        if group_by:
+            positions = ', '.join(str(position) for position in range(1, len(group_by) + 1))
+            query += f" GROUP BY {positions} ORDER BY {positions}"
+        return query, tuple(params)
+    
+    def get_rollups(self, group_by: Iterable[str] = ('month',), start: Any = None, end: Any = None,
+                    filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """
+        Aggregate NCR counts from the rollup tables.
+        
+        ``group_by`` mixes periods ('day', 'month', 'year' of creation) and
+        ROLLUP_DIMENSIONS; an empty group_by returns a single totals row.
+        ``start``/``end`` are inclusive creation dates and ``filters`` maps
+        dimensions to a value or list of values (None matches missing).
+        Each row carries ncr_count, closed_count, resolved_count and
+        resolution_days_sum (over resolved NCRs).
+        """
+        query, params = self._rollup_query(group_by, start, end, filters)
+        rows = self.execute_query(query, params)
+        for row in rows:
+            for key in row.keys() & ROLLUP_DIMENSIONS.keys():
+                if row[key] == ROLLUP_UNSET.get(key, ''):
+                    row[key] = None
+        return rows
 
 # Global database instance
 db = DatabaseManager()
\ No newline at end of file
@@ -21,6 +21,9 @@ from components import (  # noqa: E402
     apply_plotly_theme,
     sidebar_brand,
     sidebar_user_info,
+    load_tag_suggestions,
+    start_page_profile,
+    profiler_panel,
 )
 from database import db  # noqa: E402
 
@@ -30,13 +33,6 @@ st.set_page_config(
     layout="wide",
 )
 
-inject_theme_css()
-apply_plotly_theme()
-auth_guard()
-
-sidebar_brand()
-sidebar_user_info()
-
 SECTION_LABELS = {
     1: "Section 1: NCR Details",
     2: "Section 2: NC Level & CAPA",
@@ -93,22 +89,13 @@ def set_section(section_index: int):
 
 
 def get_tag_suggestions() -> List[str]:
-    """Collect a unique, sorted list of tags already used across NCRs."""
+    """Most frequently used tags across NCRs."""
     try:
-        records = db.get_ncrs()
+        with profile.phase("db"):
+            return load_tag_suggestions(limit=TAG_SUGGESTION_LIMIT)
     except Exception:  # pragma: no cover - defensive against DB access issues
         return []
 
-    tag_set = {
-        tag.strip()
-        for record in records
-        for tag in (record.get("tags") or [])
-        if isinstance(tag, str) and tag.strip()
-    }
-
-    sorted_tags = sorted(tag_set, key=lambda value: value.lower())
-    return sorted_tags[:TAG_SUGGESTION_LIMIT]
-
 
 def render_navigation():
     """Render section navigation pills."""
@@ -720,8 +707,9 @@ def submit_ncr():
     }
 
     try:
-        ncr_id = db.create_ncr(ncr_payload)
-        record = db.get_ncr_by_id(ncr_id)
+        with profile.phase("db"):
+            ncr_id = db.create_ncr(ncr_payload)
+            record = db.get_ncr_by_id(ncr_id)
         st.session_state.ncr_form_data = {}
         st.session_state.current_section = 1
         st.session_state.current_ncr = ncr_id
@@ -737,24 +725,35 @@ def submit_ncr():
         st.error(f"Error creating NCR: {exc}")
 
 
-init_form_state()
+# The helpers above read ``profile`` when called from inside this block
+with start_page_profile("New NCR") as profile:
+    inject_theme_css()
+    apply_plotly_theme()
+    auth_guard()
 
-st.markdown("## ➕ Create New NCR")
-st.markdown(
-    "Use the guided workflow below to capture all required information for a new Non-Conformance Report."
-)
+    sidebar_brand()
+    sidebar_user_info()
+
+    init_form_state()
+
+    st.markdown("## ➕ Create New NCR")
+    st.markdown(
+        "Use the guided workflow below to capture all required information for a new Non-Conformance Report."
+    )
+
+    render_navigation()
+    st.markdown("---")
+
+    current_section = st.session_state.current_section
+    if current_section == 1:
+        render_section_1()
+    elif current_section == 2:
+        render_section_2()
+    elif current_section == 3:
+        render_section_3()
+    elif current_section == 4:
+        render_section_4()
+    else:
+        render_section_5()
 
-render_navigation()
-st.markdown("---")
-
-current_section = st.session_state.current_section
-if current_section == 1:
-    render_section_1()
-elif current_section == 2:
-    render_section_2()
-elif current_section == 3:
-    render_section_3()
-elif current_section == 4:
-    render_section_4()
-else:
-    render_section_5()
+    profiler_panel(profile)
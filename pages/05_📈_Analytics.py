@@ -5,7 +5,7 @@ Analytics Page - Deep dive visualizations for NCTracker multipage app
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import sys
 from pathlib import Path
 
@@ -19,8 +19,13 @@ from components import (  # noqa: E402
     sidebar_user_info,
     metric_card,
     empty_state,
+    load_dashboard_stats,
+    load_rollups,
+    page_loads,
+    start_page_profile,
+    profiler_panel,
 )
-from database import db  # noqa: E402
+from database import NCR_EXPORT_COLUMNS  # noqa: E402
 import utils  # noqa: E402
 
 st.set_page_config(
@@ -28,197 +33,243 @@ st.set_page_config(
     page_icon="📈",
     layout="wide",
 )
+with start_page_profile("Analytics") as profile:
 
-inject_theme_css()
-apply_plotly_theme()
-auth_guard()
+    inject_theme_css()
+    apply_plotly_theme()
+    auth_guard()
 
-sidebar_brand()
-sidebar_user_info()
+    sidebar_brand()
+    sidebar_user_info()
 
-st.markdown("## 📈 Analytics Dashboard")
-st.markdown(
-    "Understand trends, categories, and resolution performance across all Non-Conformance Reports."
-)
-
-stats = db.get_dashboard_stats()
-ncrs = db.get_ncrs()
-
-if not ncrs:
-    empty_state(
-        icon="📉",
-        title="No Analytics Yet",
-        message="Create NCRs to unlock analytics and trend insights.",
-    )
-    st.stop()
-
-df = pd.DataFrame(ncrs)
-df["created_at"] = pd.to_datetime(df["created_at"], format="mixed", errors="coerce")
-df["created_date"] = df["created_at"].dt.date
-df["created_month"] = df["created_at"].dt.to_period("M")
-if "closed_at" in df.columns:
-    df["closed_at"] = pd.to_datetime(df["closed_at"], format="mixed", errors="coerce")
-
-closed_mask = df["status"] == "CLOSED"
-closed_ncrs = int(closed_mask.sum())
-open_ncrs = int((df["status"] != "CLOSED").sum())
-
-col1, col2, col3 = st.columns(3)
-with col1:
-    metric_card(
-        label="Total NCRs",
-        value=str(stats["total_ncrs"]),
-        delta=f"+{stats['recent_ncrs']} last 30 days",
-        delta_color="normal",
-        icon="📊",
-    )
-with col2:
-    metric_card(
-        label="Closed NCRs",
-        value=str(closed_ncrs),
-        delta=f"{stats['total_ncrs'] - closed_ncrs} open",
-        delta_color="positive" if open_ncrs == 0 else "negative",
-        icon="✅",
-    )
-with col3:
-    metric_card(
-        label="Avg Resolution",
-        value=f"{stats['avg_resolution_days']:.1f} days",
-        delta="Lower is better",
-        delta_color="positive" if stats["avg_resolution_days"] < 20 else "normal",
-        icon="⏱️",
+    st.markdown("## 📈 Analytics Dashboard")
+    st.markdown(
+        "Understand trends, categories, and resolution performance across all Non-Conformance Reports."
     )
 
-st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
+    PERIODS = {
+        "All time": None,
+        "Last 12 months": 365,
+        "Last 90 days": 90,
+        "Last 30 days": 30,
+    }
 
-st.markdown("### 📊 Monthly NCR Trend")
-monthly_counts = (
-    df.dropna(subset=["created_month"]).groupby("created_month").size().reset_index(name="count")
-)
-monthly_counts["created_month"] = monthly_counts["created_month"].astype(str)
-if not monthly_counts.empty:
-    fig_monthly = px.line(
-        monthly_counts,
-        x="created_month",
-        y="count",
-        markers=True,
-        title="NCRs Created per Month",
-    )
-    fig_monthly.update_layout(height=400, margin=dict(t=60, b=60, l=60, r=40))
-    st.plotly_chart(fig_monthly, use_container_width=True)
-else:
-    st.info("Not enough data to display monthly trends.")
-
-st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
-
-col1, col2 = st.columns(2)
-with col1:
-    st.markdown("### 📂 Problem Categories")
-    if not df["problem_category"].dropna().empty:
-        category_counts = (
-            df["problem_category"].fillna("Unspecified").value_counts().reset_index()
+    profile.mark("db")
+    stats = load_dashboard_stats()
+    profile.mark("render")
+
+    if not stats["total_ncrs"]:
+        empty_state(
+            icon="📉",
+            title="No Analytics Yet",
+            message="Create NCRs to unlock analytics and trend insights.",
         )
-        category_counts.columns = ["Category", "Count"]
-        fig_category = px.pie(
-            category_counts,
-            names="Category",
-            values="Count",
-            hole=0.45,
-            title="Distribution by Problem Category",
+        st.stop()
+
+    period = st.selectbox("Period", options=list(PERIODS), key="analytics_period")
+    start = date.today() - timedelta(days=PERIODS[period]) if PERIODS[period] else None
+
+    profile.mark("db")
+    with page_loads("Analytics") as loads:
+        totals_rows, monthly_rows, category_rows, disposition_rows, resolution_rows = loads.gather(
+            *(loads.submit(load_rollups, group_by, start=start)
+              for group_by in ([], ["month"], ["problem_category"], ["disposition_action"], ["resolution_days"]))
         )
-        fig_category.update_layout(height=380, margin=dict(t=50, b=40, l=20, r=20))
-        st.plotly_chart(fig_category, use_container_width=True)
-    else:
-        st.info("Problem categories will appear once NCRs include that data.")
+    totals = totals_rows[0]
+
+    profile.mark("transform")
+    monthly_counts = pd.DataFrame(monthly_rows)
+    category_counts = pd.DataFrame(category_rows)
+    disposition_counts = pd.DataFrame(disposition_rows)
+    resolution_counts = pd.DataFrame(resolution_rows)
+    if not resolution_counts.empty:
+        resolution_counts = resolution_counts.dropna(subset=["resolution_days"])
+    closed_ncrs = totals["closed_count"]
+    open_ncrs = totals["ncr_count"] - closed_ncrs
+    avg_resolution = (
+        totals["resolution_days_sum"] / totals["resolved_count"] if totals["resolved_count"] else 0
+    )
+    profile.mark("render")
 
-with col2:
-    st.markdown("### ⚡ Disposition Actions")
-    if not df["disposition_action"].dropna().empty:
-        disposition_counts = (
-            df["disposition_action"].fillna("Unspecified").value_counts().reset_index()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_card(
+            label="Total NCRs",
+            value=str(totals["ncr_count"]),
+            delta=f"+{stats['recent_ncrs']} last 30 days",
+            delta_color="normal",
+            icon="📊",
         )
-        disposition_counts.columns = ["Disposition", "Count"]
-        fig_disposition = px.bar(
-            disposition_counts,
-            x="Disposition",
-            y="Count",
-            title="Disposition Action Distribution",
-            text="Count",
+    with col2:
+        metric_card(
+            label="Closed NCRs",
+            value=str(closed_ncrs),
+            delta=f"{open_ncrs} open",
+            delta_color="positive" if open_ncrs == 0 else "negative",
+            icon="✅",
         )
-        fig_disposition.update_layout(
-            height=380,
-            margin=dict(t=60, b=80, l=40, r=20),
-            xaxis_tickangle=-25,
+    with col3:
+        metric_card(
+            label="Avg Resolution",
+            value=f"{avg_resolution:.1f} days",
+            delta="Lower is better",
+            delta_color="positive" if avg_resolution < 20 else "normal",
+            icon="⏱️",
+        )
+
+    st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
+
+    st.markdown("### 📊 Monthly NCR Trend")
+    if not monthly_counts.empty:
+        profile.mark("chart")
+        fig_monthly = px.line(
+            monthly_counts,
+            x="month",
+            y="ncr_count",
+            markers=True,
+            title="NCRs Created per Month",
+            labels={"month": "created_month", "ncr_count": "count"},
         )
-        fig_disposition.update_traces(textposition="outside")
-        st.plotly_chart(fig_disposition, use_container_width=True)
+        fig_monthly.update_layout(height=400, margin=dict(t=60, b=60, l=60, r=40))
+        profile.mark("render")
+        st.plotly_chart(fig_monthly, use_container_width=True)
     else:
-        st.info("Disposition analytics will populate as NCRs progress.")
+        st.info("Not enough data to display monthly trends.")
 
-st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
+    st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
 
-st.markdown("### ⏱️ Resolution Time Analysis")
-if closed_ncrs and df["closed_at"].notna().any():
-    resolution_days = (
-        df.loc[closed_mask & df["closed_at"].notna(), "closed_at"]
-        - df.loc[closed_mask & df["closed_at"].notna(), "created_at"]
-    ).dt.days
-    if not resolution_days.empty:
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 📂 Problem Categories")
+        if not category_counts.empty and category_counts["problem_category"].notna().any():
+            profile.mark("chart")
+            category_counts["problem_category"] = category_counts["problem_category"].fillna("Unspecified")
+            fig_category = px.pie(
+                category_counts,
+                names="problem_category",
+                values="ncr_count",
+                hole=0.45,
+                title="Distribution by Problem Category",
+                labels={"problem_category": "Category", "ncr_count": "Count"},
+            )
+            fig_category.update_layout(height=380, margin=dict(t=50, b=40, l=20, r=20))
+            profile.mark("render")
+            st.plotly_chart(fig_category, use_container_width=True)
+        else:
+            st.info("Problem categories will appear once NCRs include that data.")
+
+    with col2:
+        st.markdown("### ⚡ Disposition Actions")
+        if not disposition_counts.empty and disposition_counts["disposition_action"].notna().any():
+            profile.mark("chart")
+            disposition_counts["disposition_action"] = (
+                disposition_counts["disposition_action"].fillna("Unspecified")
+            )
+            disposition_counts = disposition_counts.sort_values("ncr_count", ascending=False)
+            fig_disposition = px.bar(
+                disposition_counts,
+                x="disposition_action",
+                y="ncr_count",
+                title="Disposition Action Distribution",
+                text="ncr_count",
+                labels={"disposition_action": "Disposition", "ncr_count": "Count"},
+            )
+            fig_disposition.update_layout(
+                height=380,
+                margin=dict(t=60, b=80, l=40, r=20),
+                xaxis_tickangle=-25,
+            )
+            fig_disposition.update_traces(textposition="outside")
+            profile.mark("render")
+            st.plotly_chart(fig_disposition, use_container_width=True)
+        else:
+            st.info("Disposition analytics will populate as NCRs progress.")
+
+    st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
+
+    st.markdown("### ⏱️ Resolution Time Analysis")
+    if not resolution_counts.empty:
+        profile.mark("chart")
         fig_resolution = px.histogram(
-            resolution_days,
-            nbins=min(20, resolution_days.nunique()),
+            resolution_counts,
+            x="resolution_days",
+            y="ncr_count",
+            histfunc="sum",
+            nbins=min(20, len(resolution_counts)),
             title="Distribution of Resolution Times",
-            labels={"value": "Days to Close"},
+            labels={"resolution_days": "Days to Close", "ncr_count": "count"},
         )
         fig_resolution.update_layout(height=400, margin=dict(t=60, b=60, l=60, r=40))
+        profile.mark("render")
         st.plotly_chart(fig_resolution, use_container_width=True)
     else:
-        st.info("Resolution time requires both creation and closure timestamps.")
-else:
-    st.info("Closed NCRs with timestamps are needed to analyse resolution time.")
-
-st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
-
-st.markdown("### 📤 Export & Reporting")
-col1, col2 = st.columns(2)
-
-with col1:
-    if st.button("📊 Prepare Excel Export"):
-        excel_data = utils.export_to_excel(ncrs)
-        if excel_data:
-            st.download_button(
-                label="Download Excel",
-                data=excel_data,
-                file_name=f"ncr_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-        else:
-            st.warning("Excel export is unavailable for this dataset.")
-
-with col2:
-    report_lines = [
-        "NCTracker Summary Report",
-        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        "",
-        "=== OVERVIEW ===",
-        f"Total NCRs: {stats['total_ncrs']}",
-        f"Recent NCRs (30 days): {stats['recent_ncrs']}",
-        f"Average Resolution Time: {stats['avg_resolution_days']:.1f} days",
-        "",
-        "=== STATUS BREAKDOWN ===",
-    ]
-    for status, count in stats["status_counts"].items():
-        report_lines.append(f"{status}: {count} NCRs")
-    report_lines.append("")
-    report_lines.append("=== NC LEVEL BREAKDOWN ===")
-    for level, count in stats["nc_level_counts"].items():
-        report_lines.append(f"Level {level}: {count} NCRs")
-
-    report_content = "\n".join(report_lines)
-
-    st.download_button(
-        label="📄 Download Text Summary",
-        data=report_content,
-        file_name=f"ncr_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-        mime="text/plain",
-    )
+        st.info("Closed NCRs with timestamps are needed to analyse resolution time.")
+
+    st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
+
+    st.markdown("### 📤 Export & Reporting")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        export_columns = st.multiselect(
+            "Columns",
+            options=list(NCR_EXPORT_COLUMNS),
+            default=utils.EXPORT_DEFAULT_COLUMNS,
+            key="analytics_export_columns",
+        )
+        export_format = st.radio(
+            "Format",
+            options=["xlsx", "csv"],
+            format_func=lambda fmt: "Excel (.xlsx)" if fmt == "xlsx" else "CSV (.csv)",
+            horizontal=True,
+            key="analytics_export_format",
+        )
+        def build_export(file_format=export_format, columns=tuple(export_columns)):
+            # Runs only when the button is clicked. The export is streamed to a
+            # temp file, but Streamlit serves downloads from in-memory media
+            # storage, so the finished file is held in server memory once per
+            # click until the session's next rerun releases it.
+            export_path = utils.export_ncrs(file_format, columns=list(columns))
+            try:
+                return export_path.read_bytes()
+            finally:
+                export_path.unlink(missing_ok=True)
+
+        st.download_button(
+            label=f"📊 Download {export_format.upper()}",
+            data=build_export,
+            file_name=f"ncr_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}",
+            mime=utils.EXPORT_MIME_TYPES[export_format],
+            on_click="ignore",
+            disabled=not export_columns,
+        )
+
+    with col2:
+        report_lines = [
+            "NCTracker Summary Report",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "",
+            "=== OVERVIEW ===",
+            f"Total NCRs: {stats['total_ncrs']}",
+            f"Recent NCRs (30 days): {stats['recent_ncrs']}",
+            f"Average Resolution Time: {stats['avg_resolution_days']:.1f} days",
+            "",
+            "=== STATUS BREAKDOWN ===",
+        ]
+        for status, count in stats["status_counts"].items():
+            report_lines.append(f"{status}: {count} NCRs")
+        report_lines.append("")
+        report_lines.append("=== NC LEVEL BREAKDOWN ===")
+        for level, count in stats["nc_level_counts"].items():
+            report_lines.append(f"Level {level}: {count} NCRs")
+
+        report_content = "\n".join(report_lines)
+
+        st.download_button(
+            label="📄 Download Text Summary",
+            data=report_content,
+            file_name=f"ncr_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            mime="text/plain",
+        )
+
+    profiler_panel(profile)
@@ -0,0 +1,110 @@
+"""
+Performance Page - Query timing and slow-query log for administrators
+"""
+
+import streamlit as st
+import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from components import (  # noqa: E402
+    auth_guard,
+    inject_theme_css,
+    sidebar_brand,
+    sidebar_user_info,
+    empty_state,
+    profile_records,
+)
+from components.profiler import PROFILE_PHASES  # noqa: E402
+from database import db  # noqa: E402
+
+st.set_page_config(
+    page_title="Performance - NCTracker",
+    page_icon="⚙️",
+    layout="wide",
+)
+
+inject_theme_css()
+auth_guard()
+
+sidebar_brand()
+sidebar_user_info()
+
+if st.session_state.user.get("role") != "admin":
+    st.error("Performance diagnostics are available to administrators only.")
+    st.stop()
+
+st.markdown("## ⚙️ Performance")
+st.markdown("Statement latency by query, data-access method and page.")
+
+st.markdown("### ⏱️ Query Timing")
+col1, col2, col3 = st.columns([2, 2, 1])
+with col1:
+    timing_enabled = st.toggle("Record query timings", value=db.query_log.enabled)
+with col2:
+    slow_ms = st.number_input(
+        "Slow-query threshold (ms)",
+        min_value=1.0,
+        value=float(db.query_log.slow_ms),
+        step=50.0,
+    )
+with col3:
+    if st.button("Reset", help="Discard recorded timings and slow queries"):
+        db.reset_query_timings()
+db.set_query_timing(timing_enabled, slow_ms=slow_ms)
+
+group_by = st.radio(
+    "Group by",
+    options=["fingerprint", "method", "caller"],
+    format_func={"fingerprint": "Query", "method": "Method", "caller": "Page"}.get,
+    horizontal=True,
+)
+timings = db.get_query_timings(group_by)
+if timings:
+    timings_frame = pd.DataFrame(timings)
+    for column in ("methods", "callers"):
+        timings_frame[column] = timings_frame[column].str.join(", ")
+    st.dataframe(timings_frame, use_container_width=True, hide_index=True)
+else:
+    empty_state(
+        icon="⏱️",
+        title="No Timings Yet",
+        message="Enable query timing (or set NCTRACKER_QUERY_TIMING=1) and use the app to collect samples.",
+    )
+
+st.markdown("### 🐢 Slow Queries")
+slow_queries = db.get_slow_queries()
+if slow_queries:
+    st.caption(f"Logged to {db.query_log.log_path}" if db.query_log.log_path else "Kept in memory only")
+    for entry in slow_queries[:25]:
+        label = f"{entry['ms']:.0f} ms · {entry['method'] or 'direct'} · {entry['caller'] or 'unknown'} · {entry['at']}"
+        with st.expander(label):
+            st.code(entry["fingerprint"], language="sql")
+            st.markdown(f"**Rows:** {entry['rows']} &nbsp; **Params:** `{entry['params']}`")
+            if entry["plan"]:
+                st.code("\n".join(entry["plan"]), language="text")
+else:
+    st.info(f"No statements slower than {db.query_log.slow_ms:.0f} ms recorded.")
+
+st.markdown("### 🧭 Page Profiles")
+records = profile_records()
+if records:
+    profile_frame = pd.DataFrame(records)
+    phase_columns = ["total_ms"] + [f"{phase}_ms" for phase in PROFILE_PHASES]
+    breakdown = profile_frame.groupby("page")[phase_columns].mean().round(1)
+    breakdown.insert(0, "reruns", profile_frame.groupby("page").size())
+    breakdown["p95_total_ms"] = profile_frame.groupby("page")["total_ms"].quantile(0.95).round(1)
+    st.dataframe(breakdown.sort_values("total_ms", ascending=False), use_container_width=True)
+    st.caption("Mean milliseconds per rerun; render is time not attributed to another phase.")
+
+    captures = [record for record in records if record["profile"]]
+    for record in captures[:5]:
+        with st.expander(f"{record['capture']} · {record['page']} · {record['total_ms']:.0f} ms · {record['at']}"):
+            st.code(record["profile"], language="text")
+else:
+    st.info(
+        "No page reruns recorded. Set NCTRACKER_PROFILE_PAGES=1 or use the "
+        "⏱️ Page Profiler panel in the sidebar of any page."
+    )
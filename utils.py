@@ -3,29 +3,43 @@ NCTracker Utility Functions
 Helper functions for the application
 """
 
+import csv
 import hashlib
+import json
 import os
+import tempfile
 from datetime import datetime, date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import pandas as pd
 import streamlit as st
 from pathlib import Path
 
+from database import parse_timestamp
+
 def hash_password(password: str) -> str:
     """Hash a password for storage"""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def format_date(date_obj) -> str:
+def format_date(date_obj, fmt: str = '%Y-%m-%d %H:%M') -> str:
     """Format date for display"""
     if isinstance(date_obj, str):
-        try:
-            date_obj = pd.to_datetime(date_obj).date()
-        except:
+        parsed = parse_timestamp(date_obj)
+        if parsed is None:
             return date_obj
+        date_obj = parsed
     if isinstance(date_obj, (date, datetime)):
-        return date_obj.strftime('%Y-%m-%d %H:%M')
+        return date_obj.strftime(fmt)
     return str(date_obj)
 
+FRAME_TIMESTAMP_COLUMNS = ['created_at', 'updated_at', 'closed_at', 'closure_date', 'uploaded_at']
+
+def to_timestamps(frame: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Convert stored timestamp columns of ``frame`` to datetime64 in place, vectorized"""
+    for column in columns or FRAME_TIMESTAMP_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column], format='ISO8601', errors='coerce')
+    return frame
+
 def get_ncr_status_color(status: str) -> str:
     """Get color for NCR status"""
     colors = {
@@ -79,12 +93,11 @@ def validate_email(email: str) -> bool:
 
 def calculate_resolution_time(created_at, closed_at) -> float:
     """Calculate resolution time in days"""
-    try:
-        created = pd.to_datetime(created_at)
-        closed = pd.to_datetime(closed_at)
-        return (closed - created).days
-    except:
+    created = parse_timestamp(created_at)
+    closed = parse_timestamp(closed_at)
+    if created is None or closed is None:
         return None
+    return (closed - created).days
 
 def get_user_initials(full_name: str) -> str:
     """Get user initials from full name"""
@@ -116,9 +129,10 @@ def export_to_excel(ncrs: List[Dict]) -> bytes:
     export_df = df[available_columns].copy()
     
     # Format dates
+    to_timestamps(export_df, ['created_at', 'updated_at', 'closed_at'])
     for col in ['created_at', 'updated_at', 'closed_at']:
         if col in export_df.columns:
-            export_df[col] = pd.to_datetime(export_df[col]).dt.strftime('%Y-%m-%d %H:%M')
+            export_df[col] = export_df[col].dt.strftime('%Y-%m-%d %H:%M')
     
     # Convert to Excel
     import io
@@ -129,6 +143,257 @@ def export_to_excel(ncrs: List[Dict]) -> bytes:
     
     return output.getvalue()
 
+EXPORT_DEFAULT_COLUMNS = [
+    'ncr_number', 'title', 'status', 'nc_level', 'site', 'part_number',
+    'part_number_rev', 'quantity_affected', 'project_affected', 'supplier',
+    'problem_category', 'disposition_action', 'created_by_name', 'created_at',
+    'updated_at', 'closed_at'
+]
+EXPORT_DATE_COLUMNS = {'created_at', 'updated_at', 'closed_at'}
+EXPORT_LIST_COLUMNS = {'required_approvals', 'correction_actions', 'tags'}
+EXPORT_MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+}
+
+def _export_value(column: str, value):
+    """Format a raw column value for a spreadsheet cell"""
+    if value is None:
+        return None
+    if column in EXPORT_DATE_COLUMNS:
+        # ISO timestamps, with either separator, trimmed to minutes
+        return str(value)[:16].replace('T', ' ')
+    if column in EXPORT_LIST_COLUMNS:
+        try:
+            return '; '.join(str(item) for item in json.loads(value))
+        except (TypeError, ValueError):
+            return value
+    return value
+
+def export_ncrs(file_format: str = 'xlsx', columns: Optional[List[str]] = None,
+                filters: Dict = None, sort='newest') -> Path:
+    """
+    Stream NCRs into a temporary .xlsx or .csv file and return its path.
+    
+    Rows are read from a database cursor in chunks (see db.iter_ncrs) and
+    written through a write-only workbook or a csv writer, so memory stays
+    flat regardless of the number of NCRs. ``columns`` picks and orders the
+    output columns from database.NCR_EXPORT_COLUMNS. The caller owns the
+    returned file and should delete it once served.
+    """
+    from database import db
+    
+    if file_format not in EXPORT_MIME_TYPES:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    columns = list(columns or EXPORT_DEFAULT_COLUMNS)
+    chunks = db.iter_ncrs(columns, filters=filters, sort=sort)
+    
+    fd, path = tempfile.mkstemp(prefix='ncr_export_', suffix=f'.{file_format}')
+    try:
+        if file_format == 'csv':
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8-sig') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(columns)
+                for rows in chunks:
+                    writer.writerows(
+                        [_export_value(column, value) for column, value in zip(columns, row)]
+                        for row in rows
+                    )
+        else:
+            os.close(fd)
+            from openpyxl import Workbook
+            
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('NCRs')
+            sheet.append(columns)
+            for rows in chunks:
+                for row in rows:
+                    sheet.append([_export_value(column, value) for column, value in zip(columns, row)])
+            workbook.save(path)
+    except BaseException:
+        os.unlink(path)
+        raise
+    finally:
+        # Release the cursor's pool connection even if writing stopped early
+        chunks.close()
+    return Path(path)
+
+# Column types for columnar snapshots; 'list' columns hold JSON arrays of strings
+SNAPSHOT_TABLES = {
+    'ncrs': {
+        'watermark': 'updated_at',
+        'columns': {
+            'id': 'int64', 'ncr_number': 'string', 'title': 'string', 'status': 'string',
+            'priority': 'int32', 'site': 'string', 'part_number': 'string', 'part_number_rev': 'string',
+            'quantity_affected': 'int64', 'units_affected': 'string', 'project_affected': 'string',
+            'serial_number': 'string', 'other_id': 'string', 'po_number': 'string', 'supplier': 'string',
+            'build_group_operation': 'string', 'problem_is': 'string', 'problem_should_be': 'string',
+            'is_contained': 'bool', 'how_contained': 'string', 'containment_justification': 'string',
+            'nc_level': 'int32', 'capa_required': 'bool', 'capa_number': 'string', 'qe_assigned': 'bool',
+            'nc_owner_assigned': 'bool', 'external_notification_required': 'bool',
+            'external_notification_method': 'string', 'problem_category': 'string',
+            'disposition_action': 'string', 'disposition_instructions': 'string',
+            'disposition_justification': 'string', 'required_approvals': 'list',
+            'correction_actions': 'list', 'evidence_of_completion': 'string', 'tags': 'list',
+            'closure_date': 'date', 'qe_audit_complete': 'bool', 'created_by': 'int64',
+            'assigned_to': 'int64', 'created_at': 'timestamp', 'updated_at': 'timestamp',
+            'closed_at': 'timestamp',
+        },
+    },
+    'comments': {
+        'watermark': 'id',
+        'columns': {
+            'id': 'int64', 'ncr_id': 'int64', 'user_id': 'int64', 'content': 'string',
+            'created_at': 'timestamp',
+        },
+    },
+    'status_history': {
+        'watermark': 'id',
+        'columns': {
+            'id': 'int64', 'ncr_id': 'int64', 'user_id': 'int64', 'old_status': 'string',
+            'new_status': 'string', 'change_reason': 'string', 'created_at': 'timestamp',
+        },
+    },
+}
+SNAPSHOT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+SNAPSHOT_MANIFEST = 'snapshot_manifest.json'
+
+def _arrow_type(pa, kind: str):
+    return {
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'string': pa.string(),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+        'list': pa.list_(pa.string()),
+    }[kind]
+
+def _parse_json_list(value):
+    if value is None:
+        return None
+    try:
+        items = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    return [str(item) for item in items] if isinstance(items, list) else None
+
+def _parse_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value).strip()).replace(tzinfo=None) if value else None
+    except ValueError:
+        return None
+
+def _arrow_column(pa, kind: str, values):
+    """Build a typed Arrow array from raw SQLite values"""
+    arrow_type = _arrow_type(pa, kind)
+    if kind == 'list':
+        return pa.array([_parse_json_list(value) for value in values], type=arrow_type)
+    if kind == 'bool':
+        return pa.array([_parse_bool(value) for value in values], type=arrow_type)
+    if kind in ('timestamp', 'date'):
+        strings = pa.array([str(value) if value not in (None, '') else None for value in values],
+                           type=pa.string())
+        try:
+            return strings.cast(pa.timestamp('us')).cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            parsed = [_parse_timestamp(value) for value in values]
+            if kind == 'date':
+                parsed = [value.date() if value else None for value in parsed]
+            return pa.array(parsed, type=arrow_type)
+    if kind == 'string':
+        return pa.array([None if value is None else str(value) for value in values], type=arrow_type)
+    return pa.array(values, type=arrow_type)
+
+def export_snapshot(out_dir, file_format: str = 'parquet', incremental: bool = True,
+                    tables: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Write the ncrs, comments and status_history tables to typed Parquet or
+    Arrow IPC files in ``out_dir``.
+    
+    Timestamps become timestamp[us] columns, yes/no fields become booleans
+    and the JSON list fields (tags, required_approvals, correction_actions)
+    become list<string>. With ``incremental``, only ncrs rows whose
+    updated_at is at or after the previous snapshot's high-water mark, and
+    comments/status_history rows with a higher id, are written; the marks
+    are kept in a manifest next to the files. Consumers should upsert by id,
+    since rows at the mark itself are exported again. Deletions are not
+    captured.
+    
+    Returns ``{table: {'path', 'rows', 'mode'}}``.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from database import db
+    
+    if file_format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported snapshot format: {file_format}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / SNAPSHOT_MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {'watermarks': {}, 'snapshots': []}
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+    
+    results = {}
+    for table in tables or list(SNAPSHOT_TABLES):
+        spec = SNAPSHOT_TABLES[table]
+        columns = list(spec['columns'])
+        watermark_column = spec['watermark']
+        watermark = manifest['watermarks'].get(table) if incremental else None
+        
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        params = ()
+        if watermark is not None:
+            if watermark_column == 'id':
+                query += " WHERE id > ?"
+            else:
+                query += f" WHERE julianday({watermark_column}) >= julianday(?)"
+            params = (watermark,)
+        query += " ORDER BY id"
+        
+        schema = pa.schema([(column, _arrow_type(pa, kind)) for column, kind in spec['columns'].items()])
+        mode = 'incremental' if incremental and table in manifest['watermarks'] else 'full'
+        path = out_dir / f"{table}_{mode}_{stamp}{SNAPSHOT_FORMATS[file_format]}"
+        writer = pq.ParquetWriter(path, schema) if file_format == 'parquet' else pa.ipc.new_file(str(path), schema)
+        rows_written = 0
+        high_water = watermark
+        chunks = db.iter_query(query, params)
+        try:
+            for rows in chunks:
+                values = list(zip(*rows))
+                batch = pa.record_batch(
+                    [_arrow_column(pa, spec['columns'][column], values[i]) for i, column in enumerate(columns)],
+                    schema=schema,
+                )
+                writer.write_batch(batch)
+                rows_written += len(rows)
+                mark_index = columns.index(watermark_column)
+                if watermark_column == 'id':
+                    high_water = max(high_water or 0, max(values[mark_index]))
+                else:
+                    batch_max = pc.max(batch.column(mark_index)).as_py()
+                    if batch_max is not None:
+                        batch_max = batch_max.isoformat()
+                        high_water = max(high_water, batch_max) if high_water else batch_max
+        finally:
+            chunks.close()
+            writer.close()
+        
+        manifest['watermarks'][table] = high_water
+        results[table] = {'path': str(path), 'rows': rows_written, 'mode': mode}
+    
+    manifest['snapshots'].append({'taken_at': stamp, 'format': file_format, 'tables': results})
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return results
+
 def create_sample_data():
     """Create sample data for testing"""
     import random
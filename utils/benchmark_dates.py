@@ -0,0 +1,87 @@
+"""
+NCTracker Date Handling Benchmark
+Compares per-row pd.to_datetime parsing (as the Dashboard used to do) with
+vectorized parsing of canonical timestamps, for the "previous 30 days"
+window count and the recent-NCR "Created" column.
+
+Usage:
+    python utils/benchmark_dates.py              # 100k synthetic timestamps
+    python utils/benchmark_dates.py --rows 5000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import TIMESTAMP_FORMAT  # noqa: E402
+import utils  # noqa: E402
+
+
+def timed(label, func, repeat=3):
+    """Best-of-``repeat`` wall time for ``func``"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"   {label:<44} {best * 1000:>10.1f} ms")
+    return best, result
+
+
+def main():
+    """Run the before/after date handling benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs vectorized date handling")
+    parser.add_argument('--rows', type=int, default=100_000, help="number of synthetic NCR timestamps")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    now = datetime.now()
+    values = [
+        (now - timedelta(seconds=random.randint(0, 365 * 86400))).strftime(TIMESTAMP_FORMAT)
+        for _ in range(args.rows)
+    ]
+    ncrs = [{'created_at': value} for value in values]
+    window_start, window_end = now - timedelta(days=60), now - timedelta(days=30)
+
+    print(f"📅 NCTracker Date Handling Benchmark ({args.rows:,} rows)")
+    print("=" * 60)
+
+    print("Previous 30-day window count:")
+    before, expected = timed("per-row pd.to_datetime(format='mixed')", lambda: len([
+        n for n in ncrs
+        if pd.to_datetime(n['created_at'], format='mixed') > window_start
+        and pd.to_datetime(n['created_at'], format='mixed') <= window_end
+    ]), args.repeat)
+    after, actual = timed("vectorized to_timestamps + between", lambda: int(
+        utils.to_timestamps(pd.DataFrame(ncrs))['created_at']
+        .between(window_start, window_end, inclusive='right').sum()
+    ), args.repeat)
+    assert actual == expected, (actual, expected)
+    print(f"   speedup: {before / after:,.0f}x")
+
+    print("Formatting 'Created' dates:")
+    before, expected = timed("per-row pd.to_datetime().strftime", lambda: [
+        pd.to_datetime(value, format='mixed').strftime('%Y-%m-%d') for value in values
+    ], args.repeat)
+    after, actual = timed("vectorized .dt.strftime", lambda: list(
+        pd.to_datetime(pd.Series(values), format='ISO8601').dt.strftime('%Y-%m-%d')
+    ), args.repeat)
+    assert actual == expected
+    print(f"   speedup: {before / after:,.0f}x")
+    _, scalar = timed("per-row utils.format_date (fromisoformat)", lambda: [
+        utils.format_date(value, '%Y-%m-%d') for value in values
+    ], args.repeat)
+    assert scalar == expected
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+NCTracker Result Container Benchmark
+Compares the memory and time cost of reading NCRs as a list of dicts
+(execute_query / get_ncrs) with a column-oriented RowBatch
+(query_batch / get_ncr_batch), and of turning each into a DataFrame.
+
+Runs against a throwaway database filled with synthetic NCRs, with the
+query cache disabled so only the result itself is measured.
+
+Usage:
+    python utils/benchmark_rows.py              # 50k synthetic NCRs
+    python utils/benchmark_rows.py --rows 10000 --projection summary
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import DatabaseManager, QueryCache, NCR_PROJECTIONS  # noqa: E402
+
+STATUSES = ['NEW', 'IN_PROGRESS', 'PENDING_APPROVAL', 'CLOSED']
+SITES = ['Plant A', 'Plant B', 'Plant C']
+CATEGORIES = ['Dimensional', 'Material', 'Cosmetic', 'Documentation', 'Functional']
+TAGS = ['audit', 'supplier', 'rework', 'customer', 'urgent', 'scrap']
+
+
+def synthetic_ncrs(count: int):
+    """NCR records with free-text fields of realistic length"""
+    filler = "Observed deviation from drawing requirements during inspection. "
+    for i in range(count):
+        yield {
+            'title': f"Part {i % 500:03d} out of tolerance",
+            'status': random.choice(STATUSES),
+            'site': random.choice(SITES),
+            'part_number': f"PN-{i % 500:04d}",
+            'part_number_rev': random.choice('ABCD'),
+            'problem_is': filler * random.randint(2, 8),
+            'problem_should_be': filler * random.randint(1, 4),
+            'nc_level': random.randint(1, 4),
+            'problem_category': random.choice(CATEGORIES),
+            'disposition_instructions': filler * random.randint(1, 6),
+            'correction_actions': [filler.strip()] * random.randint(0, 3),
+            'tags': random.sample(TAGS, random.randint(0, 3)),
+            'created_by': 1,
+        }
+
+
+def frame_size(frame: pd.DataFrame) -> int:
+    """DataFrame footprint, including Arrow buffers that tracemalloc can't see"""
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def measure(label: str, func, repeat: int, size=None):
+    """
+    Best-of-``repeat`` wall time, plus the retained size (traced memory, or
+    ``size(result)``) and peak traced Python memory of one run
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if size is not None:
+        retained = size(result)
+    print(f"   {label:<34} {best * 1000:>9.1f} ms {retained / 2**20:>9.1f} MB {peak / 2**20:>9.1f} MB")
+    del result
+    return retained
+
+
+def main():
+    """Run the list-of-dicts vs RowBatch benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark list-of-dicts vs RowBatch results")
+    parser.add_argument('--rows', type=int, default=50_000, help="number of synthetic NCRs")
+    parser.add_argument('--projection', choices=list(NCR_PROJECTIONS), default='full',
+                        help="columns to read (see NCR_PROJECTIONS)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(str(Path(tmp) / "benchmark.db"), cache=QueryCache(ttl=0))
+        db.bulk_create_ncrs(list(synthetic_ncrs(args.rows)))
+
+        print(f"📦 NCTracker Result Container Benchmark ({args.rows:,} NCRs, '{args.projection}' columns)")
+        print("=" * 72)
+        print(f"   {'':<34} {'time':>12} {'retained':>12} {'peak':>12}")
+
+        print("Result set:")
+        dicts = measure("list of dicts (get_ncrs)",
+                        lambda: db.get_ncrs(projection=args.projection), args.repeat)
+        batch = measure("RowBatch (get_ncr_batch)",
+                        lambda: db.get_ncr_batch(args.projection), args.repeat)
+        print(f"   RowBatch retains {dicts / batch:.1f}x less memory")
+
+        print("DataFrame:")
+        measure("pd.DataFrame(list of dicts)",
+                lambda: pd.DataFrame(db.get_ncrs(projection=args.projection)), args.repeat, frame_size)
+        measure("RowBatch.to_pandas (Arrow)",
+                lambda: db.get_ncr_batch(args.projection).to_pandas(), args.repeat, frame_size)
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,6 @@ Creates a few sample NCRs to demonstrate app functionality
 import random
 from datetime import datetime, timedelta
 import hashlib
-import sqlite3
 from database import db
 
 def create_demo_users():
@@ -35,7 +34,6 @@ def create_demo_ncrs():
     # Demo NCR data - simplified
     demo_data = [
         {
-            'ncr_number': 'NCR-0001',
             'title': 'PCB-2024-001, Temperature sensor out of range',
             'status': 'CLOSED',
             'priority': 3,
@@ -78,7 +76,6 @@ def create_demo_ncrs():
             'closed_at': '2024-11-01T14:45:00'
         },
         {
-            'ncr_number': 'NCR-0002', 
             'title': 'IC-555-REV-B, Solder joint quality issue',
             'status': 'IN_PROGRESS',
             'priority': 2,
@@ -121,7 +118,6 @@ def create_demo_ncrs():
             'closed_at': None
         },
         {
-            'ncr_number': 'NCR-0003',
             'title': 'ASSY-123-A, Dimension measurement error', 
             'status': 'NEW',
             'priority': 1,
@@ -177,11 +173,16 @@ def create_demo_ncrs():
         'sarah.wilson': 5
     }
     
-    with sqlite3.connect(db.db_path) as conn:
+    # Numbers are reserved in the same transaction as the inserts
+    with db.pool.connection() as conn:
         cursor = conn.cursor()
         
         for ncr_data in demo_data:
             try:
+                ncr_data['ncr_number'] = db.allocate_ncr_numbers(
+                    1, ncr_data['site'], int(ncr_data['created_at'][:4])
+                )[0]
+                
                 # Insert the NCR
                 cursor.execute('''
                     INSERT INTO ncrs (
@@ -213,9 +214,7 @@ def create_demo_ncrs():
                 print(f"✅ Created {ncr_data['ncr_number']}: {ncr_data['title']}")
                 
             except Exception as e:
-                print(f"❌ Error creating {ncr_data['ncr_number']}: {e}")
-        
-        conn.commit()
+                print(f"❌ Error creating {ncr_data['title']}: {e}")
 
 def main():
     """Create demo data for the application"""
@@ -4,7 +4,6 @@ Creates 100 realistic NCRs for testing and demonstration using direct SQL
 """
 
 import random
-import sqlite3
 import hashlib
 from datetime import datetime, timedelta
 from database import db
@@ -98,19 +97,19 @@ def generate_sample_ncrs(count=100):
     
     created_ncrs = []
     
-    with sqlite3.connect(db.db_path) as conn:
+    # Numbers are reserved in the same transaction as the inserts
+    with db.pool.connection() as conn:
         cursor = conn.cursor()
         
         for i in range(count):
             try:
-                # Generate NCR number
-                cursor.execute("SELECT COUNT(*) FROM ncrs")
-                count_existing = cursor.fetchone()[0]
-                ncr_number = f"NCR-{count_existing + 1:04d}"
-                
                 # Random creation date (last 365 days)
                 days_ago = random.randint(0, 365)
                 created_date = datetime.now() - timedelta(days=days_ago)
+                site = random.choice(sites)
+                
+                # Reserve the next NCR number for the site/year
+                ncr_number = db.allocate_ncr_numbers(1, site, created_date.year)[0]
                 
                 # Random user for created_by
                 creator = random.choice(users)
@@ -135,7 +134,7 @@ def generate_sample_ncrs(count=100):
                     f'{part_number}, {title}',  # title
                     status,  # status
                     nc_level,  # priority
-                    random.choice(sites),  # site
+                    site,  # site
                     part_number,  # part_number
                     random.choice(['A', 'B', 'C', 'D']) + str(random.randint(1, 5)),  # part_number_rev
                     random.randint(1, 1000),  # quantity_affected
@@ -198,8 +197,6 @@ def generate_sample_ncrs(count=100):
             except Exception as e:
                 print(f"Error creating NCR {i+1}: {e}")
                 continue
-        
-        conn.commit()
     
     return created_ncrs
 
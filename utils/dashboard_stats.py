@@ -0,0 +1,66 @@
+"""
+NCTracker Dashboard Statistics Maintenance
+Verifies the materialized dashboard statistics and analytics rollups
+against a full recompute and rebuilds them when they have drifted.
+
+Usage:
+    python utils/dashboard_stats.py            # verify only
+    python utils/dashboard_stats.py --rebuild  # rebuild if drift is found
+    python utils/dashboard_stats.py --force    # always rebuild
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import db
+
+
+def main():
+    """Verify (and optionally rebuild) the ncr_stats table and analytics rollups"""
+    parser = argparse.ArgumentParser(description="Verify or rebuild materialized dashboard statistics")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the statistics if drift is found")
+    parser.add_argument('--force', action='store_true', help="rebuild the statistics unconditionally")
+    args = parser.parse_args()
+
+    print("📊 NCTracker Dashboard Statistics Check")
+    print("=" * 60)
+
+    drift = db.verify_dashboard_stats()
+    if drift:
+        print("⚠️  Materialized statistics have drifted from the ncrs table:")
+        for stat, (materialized, recomputed) in drift.items():
+            print(f"   {stat}: stored={materialized} recomputed={recomputed}")
+    else:
+        print("✅ Materialized statistics match a full recompute")
+
+    rollup_drift = db.verify_analytics_rollups()
+    if rollup_drift:
+        print("⚠️  Analytics rollups have drifted from the ncrs table:")
+        for table, mismatched in rollup_drift.items():
+            print(f"   {table}: {mismatched} mismatched row(s)")
+    else:
+        print("✅ Analytics rollups match a full recompute")
+
+    if args.force or (args.rebuild and (drift or rollup_drift)):
+        print()
+        if args.force or drift:
+            print("🔧 Rebuilding ncr_stats...")
+            db.rebuild_dashboard_stats()
+        if args.force or rollup_drift:
+            print("🔧 Rebuilding analytics rollups...")
+            db.rebuild_analytics_rollups()
+        remaining = db.verify_dashboard_stats()
+        remaining_rollups = db.verify_analytics_rollups()
+        if remaining or remaining_rollups:
+            print(f"❌ Drift remains after rebuild: {remaining or remaining_rollups}")
+            return 1
+        print("✅ Rebuild complete")
+        return 0
+
+    return 1 if drift or rollup_drift else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
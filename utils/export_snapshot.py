@@ -0,0 +1,43 @@
+"""
+NCTracker Analytics Snapshot Export
+Writes the ncrs, comments and status_history tables to typed Parquet or
+Arrow files for BI tools. By default only rows changed since the previous
+snapshot in the same directory are written.
+
+Usage:
+    python utils/export_snapshot.py exports/            # incremental Parquet
+    python utils/export_snapshot.py exports/ --full     # everything
+    python utils/export_snapshot.py exports/ --format arrow --tables ncrs
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import utils  # noqa: E402
+
+
+def main():
+    """Export a columnar snapshot of the NCR tables"""
+    parser = argparse.ArgumentParser(description="Export NCR tables to Parquet/Arrow")
+    parser.add_argument('out_dir', type=Path, help="directory for snapshot files and the manifest")
+    parser.add_argument('--format', choices=sorted(utils.SNAPSHOT_FORMATS), default='parquet')
+    parser.add_argument('--full', action='store_true', help="ignore the manifest and export every row")
+    parser.add_argument('--tables', nargs='+', choices=list(utils.SNAPSHOT_TABLES),
+                        help="tables to export (default: all)")
+    args = parser.parse_args()
+
+    print("📦 NCTracker Snapshot Export")
+    print("=" * 60)
+
+    results = utils.export_snapshot(args.out_dir, file_format=args.format,
+                                    incremental=not args.full, tables=args.tables)
+    for table, result in results.items():
+        print(f"✅ {table}: {result['rows']} rows ({result['mode']}) -> {result['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
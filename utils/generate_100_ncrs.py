@@ -4,7 +4,6 @@ Creates 100+ realistic Non-Conformance Report (NCR) records for dashboard demons
 """
 
 import random
-import sqlite3
 import hashlib
 from datetime import datetime, timedelta
 from database import db
@@ -167,19 +166,19 @@ def generate_100_realistic_ncrs():
     created_count = 0
     failed_count = 0
     
-    with sqlite3.connect(db.db_path) as conn:
+    # Numbers are reserved in the same transaction as the inserts
+    with db.pool.connection() as conn:
         cursor = conn.cursor()
         
         for i in range(120):  # Generate 120 to ensure we get 100+
             try:
-                # Generate NCR number
-                cursor.execute("SELECT COUNT(*) FROM ncrs")
-                count_existing = cursor.fetchone()[0]
-                ncr_number = f"NCR-{count_existing + 1:04d}"
-                
                 # Random dates - distributed over past 12 months
                 days_ago = random.randint(0, 365)
                 created_date = datetime.now() - timedelta(days=days_ago)
+                site = random.choice(sites)
+                
+                # Reserve the next NCR number for the site/year
+                ncr_number = db.allocate_ncr_numbers(1, site, created_date.year)[0]
                 
                 # Choose status with realistic distribution
                 status = random.choices(
@@ -241,7 +240,7 @@ def generate_100_realistic_ncrs():
                     f'{part_number}, {title}',  # 2 - title
                     status,  # 3
                     nc_level,  # 4 - priority
-                    random.choice(sites),  # 5 - site
+                    site,  # 5 - site
                     part_number,  # 6
                     random.choice(['A', 'B', 'C', 'D']) + str(random.randint(1, 5)),  # 7 - part_number_rev
                     random.randint(1, 500),  # 8 - quantity_affected
@@ -309,8 +308,6 @@ def generate_100_realistic_ncrs():
                 failed_count += 1
                 print(f"   ⚠️ Error on NCR {i+1}: {e}")
                 continue
-        
-        conn.commit()
     
     return created_count, failed_count
 
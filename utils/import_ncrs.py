@@ -0,0 +1,201 @@
+"""
+NCTracker Bulk NCR Importer
+Loads NCRs exported from a legacy system into the database in batched
+transactions via DatabaseManager.bulk_create_ncrs.
+
+Columns are matched to ncrs fields by name (case-insensitive, spaces
+become underscores); unrecognized columns are ignored. List fields
+(tags, required_approvals, correction_actions) accept JSON arrays or
+';'/','-separated text.
+
+Usage:
+    python utils/import_ncrs.py legacy.csv --created-by 1
+    python utils/import_ncrs.py legacy.xlsx --sheet NCRs --errors import_errors.csv
+    python utils/import_ncrs.py legacy.jsonl --chunk-size 5000
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from database import db, NCR_IMPORT_COLUMNS, NCR_JSON_COLUMNS, BULK_CHUNK_SIZE
+
+INTEGER_COLUMNS = {'priority', 'quantity_affected', 'nc_level', 'created_by', 'assigned_to'}
+BOOLEAN_COLUMNS = {
+    'is_contained', 'capa_required', 'qe_assigned', 'nc_owner_assigned',
+    'external_notification_required', 'qe_audit_complete',
+}
+TRUE_VALUES = {'true', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'no', 'n', '0'}
+
+
+def normalize_header(name) -> str:
+    return str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def coerce_value(column: str, value):
+    """Convert a raw cell into the type bulk_create_ncrs expects"""
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == '':
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if column in NCR_JSON_COLUMNS:
+        if isinstance(value, list):
+            return value
+        text = str(value)
+        if text.startswith('['):
+            return json.loads(text)
+        separator = ';' if ';' in text else ','
+        return [item.strip() for item in text.split(separator) if item.strip()]
+    if column in INTEGER_COLUMNS:
+        return int(float(value))
+    if column in BOOLEAN_COLUMNS:
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"{column}: expected yes/no, got {value!r}")
+    return value
+
+
+def read_csv(path: Path, sheet=None):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_xlsx(path: Path, sheet=None):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        headers = next(rows, None) or []
+        for line_number, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            yield line_number, dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def read_jsonl(path: Path, sheet=None):
+    with open(path, encoding='utf-8') as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if line.strip():
+                yield line_number, line
+
+
+READERS = {'.csv': read_csv, '.xlsx': read_xlsx, '.jsonl': read_jsonl}
+
+
+class RecordSource:
+    """
+    Streams normalized records from a file, remembering the source line of
+    each one and collecting rows that could not be parsed at all.
+    """
+
+    def __init__(self, path: Path, file_format: str, created_by=None, sheet=None):
+        self.path = path
+        self.reader = READERS[file_format]
+        self.created_by = created_by
+        self.sheet = sheet
+        self.line_numbers = []
+        self.parse_errors = []
+        self.ignored_columns = set()
+
+    def __iter__(self):
+        for line_number, raw in self.reader(self.path, self.sheet):
+            try:
+                if isinstance(raw, str):
+                    raw = json.loads(raw)
+                    if not isinstance(raw, dict):
+                        raise ValueError("expected a JSON object")
+                record = {}
+                for name, value in raw.items():
+                    column = normalize_header(name)
+                    if column not in NCR_IMPORT_COLUMNS:
+                        self.ignored_columns.add(str(name))
+                        continue
+                    record[column] = coerce_value(column, value)
+                if record.get('created_by') is None and self.created_by is not None:
+                    record['created_by'] = self.created_by
+            except (ValueError, TypeError) as exc:
+                self.parse_errors.append({'line': line_number, 'error': str(exc), 'record': raw})
+                continue
+            self.line_numbers.append(line_number)
+            yield record
+
+
+def write_error_report(path: Path, errors):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['line', 'error', 'record'])
+        for error in errors:
+            writer.writerow([error['line'], error['error'], json.dumps(error['record'], default=str)])
+
+
+def main():
+    """Import NCRs from a CSV, XLSX or JSONL file"""
+    parser = argparse.ArgumentParser(description="Bulk import NCRs from CSV, XLSX or JSONL")
+    parser.add_argument('path', type=Path, help="file to import")
+    parser.add_argument('--format', choices=sorted(suffix.lstrip('.') for suffix in READERS),
+                        help="file format (default: from the file extension)")
+    parser.add_argument('--sheet', help="worksheet to read from an XLSX file (default: active sheet)")
+    parser.add_argument('--created-by', type=int, help="user id for rows without created_by")
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument('--no-defer', action='store_true',
+                        help="keep search/tag/statistics triggers and indexes live during the load")
+    parser.add_argument('--errors', type=Path, help="write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    file_format = f".{args.format}" if args.format else args.path.suffix.lower()
+    if file_format not in READERS:
+        print(f"❌ Unsupported file type '{file_format}'; use --format")
+        return 2
+
+    print("📥 NCTracker Bulk NCR Import")
+    print("=" * 60)
+
+    source = RecordSource(args.path, file_format, created_by=args.created_by, sheet=args.sheet)
+    result = db.bulk_create_ncrs(source, chunk_size=args.chunk_size,
+                                 defer_maintenance=False if args.no_defer else None)
+
+    errors = source.parse_errors + [
+        {'line': source.line_numbers[error['row']], 'error': error['error'], 'record': error['record']}
+        for error in result['errors']
+    ]
+    errors.sort(key=lambda error: error['line'])
+
+    if source.ignored_columns:
+        print(f"⚠️  Ignored columns: {', '.join(sorted(source.ignored_columns))}")
+    rate = result['created'] / result['elapsed'] if result['elapsed'] else 0
+    print(f"✅ Created {result['created']} NCRs in {result['elapsed']:.1f}s ({rate:,.0f} rows/s)")
+
+    if errors:
+        print(f"❌ {len(errors)} row(s) rejected")
+        for error in errors[:10]:
+            print(f"   line {error['line']}: {error['error']}")
+        if len(errors) > 10:
+            print(f"   ... and {len(errors) - 10} more")
+        if args.errors:
+            write_error_report(args.errors, errors)
+            print(f"📄 Error report written to {args.errors}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -73,6 +73,50 @@ def test_database():
         traceback.print_exc()
         return False
 
+def test_query_plans():
+    """Test that hot queries are served by indexes rather than table scans"""
+    print("\nTesting query plans...")
+    
+    try:
+        from database import db, QueryPlanError
+        
+        plans = db.verify_query_plans()
+        print(f"✓ {len(plans)} hot queries use indexes")
+        return True
+    except QueryPlanError as e:
+        print(f"✗ Query plan check failed: {e}")
+        return False
+    except Exception as e:
+        print(f"✗ Query plan test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_bulk_import_numbering():
+    """Test that imported NCR numbers are never handed out again by create_ncr"""
+    print("\nTesting bulk import numbering...")
+    
+    import tempfile
+    from pathlib import Path
+    from database import DatabaseManager, NCR_NUMBER_FORMAT
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = DatabaseManager(str(Path(tmp) / "numbering.db"))
+        try:
+            ncr = {'title': 'Numbering check', 'created_by': 1}
+            first = scratch.get_ncr_by_id(scratch.create_ncr(dict(ncr)))['ncr_number']
+            imported = NCR_NUMBER_FORMAT.format(seq=3)
+            result = scratch.bulk_create_ncrs([dict(ncr, ncr_number=imported)])
+            assert result['created'] == 1, result['errors']
+            numbers = {first, imported}
+            for _ in range(3):
+                number = scratch.get_ncr_by_id(scratch.create_ncr(dict(ncr)))['ncr_number']
+                assert number not in numbers, f"{number} was issued twice"
+                numbers.add(number)
+            print(f"✓ create_ncr continues after imported {imported}: {sorted(numbers)}")
+        finally:
+            scratch.close()
+    return True
+
 def test_app_structure():
     """Test if main app file structure is correct"""
     print("\nTesting app structure...")
@@ -94,6 +138,8 @@ def main():
     tests = [
         ("Import Test", test_imports),
         ("Database Test", test_database),
+        ("Query Plan Test", test_query_plans),
+        ("Bulk Import Numbering Test", test_bulk_import_numbering),
         ("App Structure Test", test_app_structure)
     ]
     